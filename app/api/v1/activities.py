@@ -1,15 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.schemas.activity import Activity, ActivityCreate
-from app.services.activities import create_activity, get_activity_descendants
-from app.core.deps import get_db, require_api_key
+from app.schemas.activity import Activity, ActivityBrief, ActivityCreate, ActivityMove
+from app.services.activities import create_activity, get_activity_ancestors, get_activity_descendants, move_activity
+from app.core.deps import DbSession, get_db, get_read_db, require_api_key, run_db
 from app.core.config import settings
-from typing import List
+from typing import List, Optional
 
 router = APIRouter(dependencies=[Depends(require_api_key)])
 
 @router.post("/", response_model=Activity)
-def create_activity_api(a: ActivityCreate, db: Session = Depends(get_db)):
+async def create_activity_api(a: ActivityCreate, db: DbSession = Depends(get_db)):
     """
     Создаёт новую активность.
 
@@ -31,13 +30,13 @@ def create_activity_api(a: ActivityCreate, db: Session = Depends(get_db)):
         HTTPException: Если превышена максимальная глубина вложенности или переданы некорректные данные.
     """
     try:
-        return create_activity(db, a.name, a.parent_id, settings.MAX_ACTIVITY_DEPTH)
+        return await run_db(db, create_activity, a.name, a.parent_id, settings.MAX_ACTIVITY_DEPTH, schema=Activity)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/{activity_id}/descendants", response_model=List[int])
-def get_descendants(activity_id: int, db: Session = Depends(get_db)):
+async def get_descendants(activity_id: int, db: DbSession = Depends(get_read_db)):
     """
     Возвращает список всех потомков указанной активности.
 
@@ -51,5 +50,56 @@ def get_descendants(activity_id: int, db: Session = Depends(get_db)):
    **Returns**:
     - **List[int]**: Список ID всех потомков активности.
     """
-    return list(get_activity_descendants(db, activity_id, settings.MAX_ACTIVITY_DEPTH))
+    return list(await run_db(db, get_activity_descendants, activity_id, settings.MAX_ACTIVITY_DEPTH))
 
+
+
+@router.get("/{activity_id}/ancestors", response_model=List[ActivityBrief])
+async def get_ancestors(activity_id: int, db: DbSession = Depends(get_read_db)):
+    """
+    Возвращает цепочку предков активности - от корня до непосредственного родителя.
+
+    Подходит для «хлебных крошек»: предки берутся из материализованного пути активности одним запросом.
+
+    **Params**:
+    - **x-api-key (str)**: API-ключ, передаваемый в заголовке запроса. Должен совпадать с ключом из `.env`.
+    - **activity_id (int)**: ID активности.
+
+   **Returns**:
+    - **List[ActivityBrief]**: Предки активности, начиная с корня. Для корневой активности - пустой список.
+    """
+    ancestors = await run_db(db, get_activity_ancestors, activity_id, schema=Optional[List[ActivityBrief]])
+    if ancestors is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return ancestors
+
+
+@router.post("/{activity_id}/move", response_model=Activity)
+async def move_activity_api(activity_id: int, m: ActivityMove, db: DbSession = Depends(get_db)):
+    """
+    Переносит активность вместе со всеми потомками под другого родителя.
+
+    Пути и глубины всего поддерева переписываются одним запросом. Глубина после переноса
+    по-прежнему ограничена настройкой `MAX_ACTIVITY_DEPTH`.
+
+    **Params**:
+    - **x-api-key (str)**: API-ключ, передаваемый в заголовке запроса. Должен совпадать с ключом из `.env`.
+    - **activity_id (int)**: ID переносимой активности.
+
+   **Returns**:
+    - **Activity**: Перенесённая активность
+
+     **Body**:
+    - **parent_id (int)**: ID нового родителя либо null, чтобы сделать активность корневой
+
+    **Raises**:
+        HTTPException: 404, если активности нет; 400, если родитель не найден, находится внутри
+        переносимого поддерева или превышена максимальная глубина.
+    """
+    try:
+        moved = await run_db(db, move_activity, activity_id, m.parent_id, settings.MAX_ACTIVITY_DEPTH, schema=Optional[Activity])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if moved is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return moved
@@ -1,14 +1,14 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 from app.schemas.building import Building, BuildingCreate
 from app.services import buildings
-from app.core.deps import get_db, require_api_key
-from sqlalchemy.orm import Session
+from app.core.deps import DbSession, get_db, get_read_db, require_api_key, run_db
+from app.core.pagination import Page, PageParams, page_params, paged
 from typing import List
 
 router = APIRouter(dependencies=[Depends(require_api_key)])
 
 @router.post("/", response_model=Building)
-def create_building_api(b: BuildingCreate, db: Session = Depends(get_db)):
+async def create_building_api(b: BuildingCreate, db: DbSession = Depends(get_db)):
     """
     Создаёт новое здание.
 
@@ -26,21 +26,24 @@ def create_building_api(b: BuildingCreate, db: Session = Depends(get_db)):
     **Returns**:
     - **Building**: Созданная организация.
     """
-    return buildings.create_building(db, b.address, b.latitude, b.longitude)
+    return await run_db(db, buildings.create_building, b.address, b.latitude, b.longitude, schema=Building)
 
 
 @router.get("/", response_model=List[Building])
-def list_buildings_api(db: Session = Depends(get_db)):
+async def list_buildings_api(response: Response, page: PageParams = Depends(page_params), db: DbSession = Depends(get_read_db)):
     """
-    Возвращает список всех зданий.
+    Возвращает список всех зданий постранично, в порядке id.
 
     Используется для выбора здания при создании организации или для отображения на карте.
 
     **Params**:
     - **x-api-key (str)**: API-ключ, передаваемый в заголовке запроса. Должен совпадать с ключом из `.env`.
+    - **limit (int, optional)**: Размер страницы
+    - **after (str, optional)**: Курсор следующей страницы из заголовка `X-Next-Cursor`
 
    **Returns**:
-    - **List[Building]**: Список всех зданий.
+    - **List[Building]**: Страница зданий. Если есть следующая, её курсор - в заголовке `X-Next-Cursor`.
     """
-    return buildings.get_buildings(db)
+    result = await run_db(db, buildings.get_buildings, page.limit, page.after, schema=Page[Building])
+    return paged(response, result)
 
@@ -1,15 +1,50 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlalchemy.orm import Session
-from app.schemas.organization import Organization, OrganizationCreate
-from app.services import organizations
-from app.core.deps import get_db, require_api_key
+from fastapi import APIRouter, Body, Depends, Query, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from app.schemas.geo import Latitude, Longitude, RadiusKm
+from app.schemas.organization import (
+    Organization,
+    OrganizationBatch,
+    OrganizationBulkError,
+    OrganizationBulkResult,
+    OrganizationCluster,
+    OrganizationCompact,
+    OrganizationCompactBatch,
+    OrganizationCompactWithDistance,
+    OrganizationCreate,
+    OrganizationFacets,
+    OrganizationWithDistance,
+)
+from app.services import organizations, export, org_query
+from app.services.org_rows import View
+from app.core.deps import DbSession, get_db, get_read_db, read_session, require_api_key, run_db
+from app.core.pagination import NEXT_CURSOR_HEADER, Page, PageParams, page_params, paged_json
+from app.core.responses import json_response
 from app.core.config import settings
-from typing import List, Optional
+from typing import List, Literal, Optional, Union
 
 router = APIRouter(dependencies=[Depends(require_api_key)])
 
+def _with_distance(org: dict, distance: float) -> dict:
+    # distance_km - последнее поле OrganizationWithDistance / OrganizationCompactWithDistance
+    return {**org, "distance_km": distance}
+
+def _check_name_length(name: str):
+    # более короткий шаблон pg_trgm не может взять из индекса - это полный просмотр таблицы
+    if len(name) < settings.NAME_SEARCH_MIN_LENGTH:
+        raise HTTPException(status_code=422, detail=f"name must be at least {settings.NAME_SEARCH_MIN_LENGTH} characters")
+
+def _parse_ids(ids: str, param: str) -> list[int]:
+    # ID через запятую в query-параметре, не больше BATCH_FETCH_MAX_IDS
+    try:
+        parsed = [int(i) for i in ids.split(",") if i.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{param} must be comma-separated integers")
+    if len(parsed) > settings.BATCH_FETCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"at most {settings.BATCH_FETCH_MAX_IDS} {param} per request")
+    return parsed
+
 @router.post("/", response_model=Organization)
-def create_org(o: OrganizationCreate, db: Session = Depends(get_db)):
+async def create_org(o: OrganizationCreate, db: DbSession = Depends(get_db)):
     """
     Создаёт новую организацию.
 
@@ -26,26 +61,108 @@ def create_org(o: OrganizationCreate, db: Session = Depends(get_db)):
     **Returns**:
     - **Orrganization**: Созданное здание с его ID.
     """
-    return organizations.create_organization(db, o.name, o.building_id, o.phone_numbers, o.activity_ids)
+    return await run_db(db, organizations.create_organization, o.name, o.building_id, o.phone_numbers, o.activity_ids, schema=Organization)
+
+
+@router.post("/bulk", response_model=OrganizationBulkResult)
+async def create_orgs_bulk(
+    orgs: List[OrganizationCreate] = Body(..., max_length=settings.BULK_IMPORT_MAX_ITEMS),
+    db: DbSession = Depends(get_db),
+):
+    """
+    Создаёт сразу много организаций (до `BULK_IMPORT_MAX_ITEMS` за вызов).
+
+    Организации, телефоны и связи с активностями вставляются многострочными INSERT,
+    здания и активности проверяются одним запросом на всю пачку. Строки с ошибками
+    пропускаются, остальные создаются.
+
+    **Params**:
+    - **x-api-key (str)**: API-ключ, передаваемый в заголовке запроса. Должен совпадать с ключом из `.env`.
+
+    **Body**:
+    - Список организаций в том же формате, что и для `POST /organizations/`.
+
+    **Returns**:
+    - **OrganizationBulkResult**: `ids` - ID созданных организаций в порядке запроса (null для строк с ошибками),
+      `errors` - номер строки и описание ошибки.
+    """
+    ids, errors = await run_db(db, organizations.bulk_create_organizations, [o.model_dump() for o in orgs])
+    return OrganizationBulkResult(ids=ids, errors=[OrganizationBulkError(index=i, detail=d) for i, d in errors])
 
 
-@router.get("/by-building/{building_id}", response_model=List[Organization])
-def by_building(building_id: int, db: Session = Depends(get_db)):
+@router.get("", response_model=Union[OrganizationBatch, OrganizationCompactBatch])
+async def get_orgs_batch(ids: str, view: View = "full", db: DbSession = Depends(get_read_db)):
+    """
+    Получает сразу несколько организаций по списку ID.
+
+    Замена множеству вызовов `GET /organizations/{org_id}`: все организации собираются
+    фиксированным числом запросов к базе. Для длинных списков есть `POST /organizations/batch`.
+
+    **Params**:
+    - **x-api-key (str)**: API-ключ, передаваемый в заголовке запроса. Должен совпадать с ключом из `.env`.
+    - **ids (str)**: ID организаций через запятую (не больше `BATCH_FETCH_MAX_IDS`)
+    - **view (str, optional)**: `full` (по умолчанию) - организация целиком; `compact` - только id, name, latitude, longitude
+
+    **Returns**:
+    - **OrganizationBatch**: `items` - найденные организации в порядке запроса (повторяющиеся ID - один раз),
+      `missing` - ID, которых нет.
+    """
+    items, missing = await run_db(db, organizations.get_orgs_by_ids, _parse_ids(ids, "ids"), view)
+    return json_response({"items": items, "missing": missing})
+
+
+@router.post("/batch", response_model=Union[OrganizationBatch, OrganizationCompactBatch])
+async def get_orgs_batch_post(
+    ids: List[int] = Body(..., embed=True, max_length=settings.BATCH_FETCH_MAX_IDS),
+    view: View = "full",
+    db: DbSession = Depends(get_read_db),
+):
+    """
+    То же, что `GET /organizations?ids=...`, но список ID передаётся в теле - для списков, не влезающих в URL.
+
+    **Params**:
+    - **x-api-key (str)**: API-ключ, передаваемый в заголовке запроса. Должен совпадать с ключом из `.env`.
+    - **view (str, optional)**: `full` (по умолчанию) - организация целиком; `compact` - только id, name, latitude, longitude
+
+    **Body**:
+    - **ids (List[int])**: ID организаций (не больше `BATCH_FETCH_MAX_IDS`)
+
+    **Returns**:
+    - **OrganizationBatch**: `items` - найденные организации в порядке запроса (повторяющиеся ID - один раз),
+      `missing` - ID, которых нет.
+    """
+    items, missing = await run_db(db, organizations.get_orgs_by_ids, ids, view)
+    return json_response({"items": items, "missing": missing})
+
+
+@router.get("/by-building/{building_id}", response_model=Union[List[Organization], List[OrganizationCompact]])
+async def by_building(
+    building_id: int, view: View = "full", page: PageParams = Depends(page_params), db: DbSession = Depends(get_read_db)
+):
     """
     Возвращает список организаций, расположенных в конкретном здании.
 
     **Params**:
     - **x-api-key (str)**: API-ключ, передаваемый в заголовке запроса. Должен совпадать с ключом из `.env`.
     - **building_id (int)**: ID здания
+    - **view (str, optional)**: `full` (по умолчанию) - организация целиком; `compact` - только id, name, latitude, longitude
+    - **limit (int, optional)**: Размер страницы
+    - **after (str, optional)**: Курсор следующей страницы из заголовка `X-Next-Cursor`
 
     **Returns**:
-     - **List[Organization]**: Список организаций.
+     - **List[Organization]**: Страница организаций. Если есть следующая, её курсор - в заголовке `X-Next-Cursor`.
     """
-    return organizations.get_orgs_by_building(db, building_id)
+    return paged_json(await run_db(db, organizations.get_orgs_by_building, building_id, page.limit, page.after, view))
 
 
-@router.get("/by-activity/{activity_id}", response_model=List[Organization])
-def by_activity(activity_id: int, include_descendants: bool = True, db: Session = Depends(get_db)):
+@router.get("/by-activity/{activity_id}", response_model=Union[List[Organization], List[OrganizationCompact]])
+async def by_activity(
+    activity_id: int,
+    include_descendants: bool = True,
+    view: View = "full",
+    page: PageParams = Depends(page_params),
+    db: DbSession = Depends(get_read_db),
+):
     """
     Возвращает список организаций по виду деятельности.
 
@@ -56,70 +173,292 @@ def by_activity(activity_id: int, include_descendants: bool = True, db: Session
     - **x-api-key (str)**: API-ключ, передаваемый в заголовке запроса. Должен совпадать с ключом из `.env`.
     - **activity_id (int)**: ID активности
     - **include_descendants (bool, optional)**: Включать ли возможность поиска подкатегорий активности
+    - **view (str, optional)**: `full` (по умолчанию) - организация целиком; `compact` - только id, name, latitude, longitude
+    - **limit (int, optional)**: Размер страницы
+    - **after (str, optional)**: Курсор следующей страницы из заголовка `X-Next-Cursor`
 
     **Returns**:
-     - **List[Organization]**: Список организаций.
+     - **List[Organization]**: Страница организаций. Если есть следующая, её курсор - в заголовке `X-Next-Cursor`.
     """
-    return organizations.get_orgs_by_activity(db, activity_id, include_descendants, settings.MAX_ACTIVITY_DEPTH)
+    result = await run_db(
+        db, organizations.get_orgs_by_activity, activity_id, include_descendants, settings.MAX_ACTIVITY_DEPTH,
+        page.limit, page.after, view,
+    )
+    return paged_json(result)
 
 
-@router.get("/search", response_model=List[Organization])
-def search(name: Optional[str] = None, db: Session = Depends(get_db)):
+@router.get("/search", response_model=Union[List[Organization], List[OrganizationCompact]])
+async def search(
+    name: Optional[str] = None, view: View = "full", page: PageParams = Depends(page_params), db: DbSession = Depends(get_read_db)
+):
     """
-    Поиск организаций по названию.
+    Поиск организаций по названию (по подстроке, без учёта регистра).
 
     Если name не указан, возвращается пустой список.
+    Результаты упорядочены по релевантности: самые похожие названия первыми.
+    Символы `%` и `_` ищутся как обычные символы.
 
     **Params**:
     - **x-api-key (str)**: API-ключ, передаваемый в заголовке запроса. Должен совпадать с ключом из `.env`.
-    - **name (str)**: Название организации
+    - **name (str)**: Название организации, не короче `NAME_SEARCH_MIN_LENGTH` символов
+    - **view (str, optional)**: `full` (по умолчанию) - организация целиком; `compact` - только id, name, latitude, longitude
+    - **limit (int, optional)**: Размер страницы
+    - **after (str, optional)**: Курсор следующей страницы из заголовка `X-Next-Cursor`
 
     **Returns**:
-     - **List[Organization]**: Список организаций.
+     - **List[Organization]**: Страница организаций. Если есть следующая, её курсор - в заголовке `X-Next-Cursor`.
     """
-    return organizations.search_by_name(db, name) if name else []
-
-
-@router.get("/within-radius", response_model=List[Organization])
-def within_radius(lat: float, lon: float, radius_km: float, db: Session = Depends(get_db)):
+    if not name:
+        return []
+    _check_name_length(name)
+    return paged_json(await run_db(db, organizations.search_by_name, name, page.limit, page.after, view))
+
+
+@router.get("/within-radius", response_model=Union[List[OrganizationWithDistance], List[OrganizationCompactWithDistance]])
+async def within_radius(
+    lat: Latitude,
+    lon: Longitude,
+    radius_km: RadiusKm,
+    view: View = "full",
+    page: PageParams = Depends(page_params),
+    db: DbSession = Depends(get_read_db),
+):
     """
     Находит организации в радиусе от заданной точки.
 
     Используется для отображения организаций на карте.
+    Организации отсортированы по расстоянию, ближайшие первыми.
 
     **Params**:
     - **x-api-key (str)**: API-ключ, передаваемый в заголовке запроса. Должен совпадать с ключом из `.env`.
     - **lat (float)**: Широта центра
     - **lon (float)**: Долгота центра
-    - **radius_km (float)**: Радиус в км. от центра
+    - **radius_km (float)**: Радиус в км. от центра (больше 0, не больше `MAX_RADIUS_KM`)
+    - **view (str, optional)**: `full` (по умолчанию) - организация целиком; `compact` - только id, name, latitude, longitude
+    - **limit (int, optional)**: Размер страницы
+    - **after (str, optional)**: Курсор следующей страницы из заголовка `X-Next-Cursor`
 
     **Returns**:
-     - **List[Organization]**: Список организаций.
+     - **List[OrganizationWithDistance]**: Страница организаций с расстоянием до центра (distance_km).
+       Если есть следующая, её курсор - в заголовке `X-Next-Cursor`.
     """
-    return organizations.orgs_within_radius(db, lat, lon, radius_km)
+    def call(db, *args):
+        result = organizations.orgs_within_radius(db, *args)
+        return Page(items=[_with_distance(org, d) for org, d in result.items], next_cursor=result.next_cursor)
+
+    return paged_json(await run_db(db, call, lat, lon, radius_km, page.limit, page.after, view))
 
 
-@router.get("/within-bbox", response_model=List[Organization])
-def within_bbox(lat_min: float, lon_min: float, lat_max: float, lon_max: float, db: Session = Depends(get_db)):
+@router.get("/nearest", response_model=Union[List[OrganizationWithDistance], List[OrganizationCompactWithDistance]])
+async def nearest(
+    lat: Latitude, lon: Longitude, k: int = Query(20, ge=1, le=100), view: View = "full", db: DbSession = Depends(get_read_db)
+):
+    """
+    Находит k ближайших к точке организаций.
+
+    Не нужно подбирать radius_km: ответ всегда содержит k организаций (если они есть в каталоге),
+    отсортированных по расстоянию, ближайшие первыми.
+
+    **Params**:
+    - **x-api-key (str)**: API-ключ, передаваемый в заголовке запроса. Должен совпадать с ключом из `.env`.
+    - **lat (float)**: Широта точки (-90..90)
+    - **lon (float)**: Долгота точки (-180..180)
+    - **k (int, optional)**: Сколько организаций вернуть (1-100, по умолчанию 20)
+    - **view (str, optional)**: `full` (по умолчанию) - организация целиком; `compact` - только id, name, latitude, longitude
+
+    **Returns**:
+     - **List[OrganizationWithDistance]**: Список организаций с расстоянием до точки (distance_km).
+    """
+    def call(db, *args):
+        return [_with_distance(org, d) for org, d in organizations.nearest_orgs(db, *args)]
+
+    return json_response(await run_db(db, call, lat, lon, k, view))
+
+
+@router.get("/within-bbox", response_model=Union[List[Organization], List[OrganizationCompact]])
+async def within_bbox(
+    lat_min: Latitude,
+    lon_min: Longitude,
+    lat_max: Latitude,
+    lon_max: Longitude,
+    view: View = "full",
+    page: PageParams = Depends(page_params),
+    db: DbSession = Depends(get_read_db),
+):
     """
     Находит организации внутри прямоугольной области (bounding box).
 
     **Params**:
     - **x-api-key (str)**: API-ключ, передаваемый в заголовке запроса. Должен совпадать с ключом из `.env`.
-    - **lat_min (float)**: Минимальная широта.
-    - **lon_min (float)**: Минимальная долгота.
-    - **lat_max (float)**: Максимальная широта.
-    - **lon_max (float)** Максимальная долгота.
+    - **lat_min (float)**: Минимальная широта (-90..90).
+    - **lon_min (float)**: Минимальная долгота (-180..180).
+    - **lat_max (float)**: Максимальная широта (-90..90).
+    - **lon_max (float)** Максимальная долгота (-180..180).
+    - **view (str, optional)**: `full` (по умолчанию) - организация целиком; `compact` - только id, name, latitude, longitude
+    - **limit (int, optional)**: Размер страницы
+    - **after (str, optional)**: Курсор следующей страницы из заголовка `X-Next-Cursor`
+
+    **Returns**:
+     - **List[Organization]**: Страница организаций. Если есть следующая, её курсор - в заголовке `X-Next-Cursor`.
+    """
+    result = await run_db(db, organizations.orgs_within_bbox, lat_min, lon_min, lat_max, lon_max, page.limit, page.after, view)
+    return paged_json(result)
+
+
+
+@router.get("/clusters", response_model=List[OrganizationCluster])
+async def clusters(
+    lat_min: Latitude,
+    lon_min: Longitude,
+    lat_max: Latitude,
+    lon_max: Longitude,
+    zoom: int = Query(..., ge=0, le=22),
+    db: DbSession = Depends(get_read_db),
+):
+    """
+    Группирует организации внутри bounding box в кластеры для карты на мелком масштабе.
+
+    Область делится на сетку, размер ячейки зависит от зума (примерно четверть тайла карты);
+    если ячеек получается больше `CLUSTER_MAX_CELLS`, сетка укрупняется. Поэтому размер ответа
+    ограничен, сколько бы организаций ни было в области.
+
+    **Params**:
+    - **x-api-key (str)**: API-ключ, передаваемый в заголовке запроса. Должен совпадать с ключом из `.env`.
+    - **lat_min (float)**: Минимальная широта (-90..90).
+    - **lon_min (float)**: Минимальная долгота (-180..180).
+    - **lat_max (float)**: Максимальная широта (-90..90).
+    - **lon_max (float)** Максимальная долгота (-180..180).
+    - **zoom (int)**: Зум карты (0-22)
+
+    **Returns**:
+     - **List[OrganizationCluster]**: Непустые ячейки: число организаций (count), центр (latitude, longitude)
+       и до `CLUSTER_SAMPLE_SIZE` ID организаций (sample_ids).
+    """
+    cell_size = organizations.cluster_cell_size(zoom, lat_min, lon_min, lat_max, lon_max, settings.CLUSTER_MAX_CELLS)
+    result = await run_db(
+        db, organizations.org_clusters, lat_min, lon_min, lat_max, lon_max, cell_size, settings.CLUSTER_SAMPLE_SIZE
+    )
+    return json_response(result)
+
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", export.export_ndjson),
+    "csv": ("text/csv", export.export_csv),
+}
+
+
+@router.get("/query", response_model=Union[List[Organization], List[OrganizationCompact]])
+async def query(
+    activity_id: Optional[int] = None,
+    include_descendants: bool = True,
+    lat: Optional[Latitude] = None,
+    lon: Optional[Longitude] = None,
+    radius_km: Optional[RadiusKm] = None,
+    name: Optional[str] = None,
+    view: View = "full",
+    page: PageParams = Depends(page_params),
+    db: DbSession = Depends(get_read_db),
+):
+    """
+    Организации, подходящие сразу под несколько фильтров: деятельность, радиус и название.
+
+    Все заданные фильтры объединяются одним SQL-запросом. По дешёвой оценке числа совпадений
+    самый избирательный из них выбирается ведущим, остальные проверяются только на его результатах.
+    Нужно указать хотя бы один фильтр; для фильтра по радиусу - все три параметра lat, lon и radius_km.
+
+    **Params**:
+    - **x-api-key (str)**: API-ключ, передаваемый в заголовке запроса. Должен совпадать с ключом из `.env`.
+    - **activity_id (int, optional)**: ID активности
+    - **include_descendants (bool, optional)**: Учитывать ли подвиды активности
+    - **lat (float, optional)**: Широта центра
+    - **lon (float, optional)**: Долгота центра
+    - **radius_km (float, optional)**: Радиус поиска в километрах (больше 0, не больше `MAX_RADIUS_KM`)
+    - **name (str, optional)**: Подстрока названия (без учёта регистра), не короче `NAME_SEARCH_MIN_LENGTH` символов
+    - **view (str, optional)**: `full` (по умолчанию) - организация целиком; `compact` - только id, name, latitude, longitude
+    - **limit (int, optional)**: Размер страницы
+    - **after (str, optional)**: Курсор следующей страницы из заголовка `X-Next-Cursor`
 
     **Returns**:
-     - **List[Organization]**: Список организаций.
+     - **List[Organization]**: Страница организаций в порядке id. Если есть следующая, её курсор - в заголовке `X-Next-Cursor`.
+    """
+    geo = (lat, lon, radius_km)
+    if any(v is not None for v in geo) and any(v is None for v in geo):
+        raise HTTPException(status_code=400, detail="lat, lon and radius_km must be given together")
+    if activity_id is None and radius_km is None and not name:
+        raise HTTPException(status_code=400, detail="at least one filter is required")
+    if name:
+        _check_name_length(name)
+    result = await run_db(
+        db, org_query.query_orgs, activity_id, include_descendants, settings.MAX_ACTIVITY_DEPTH,
+        lat, lon, radius_km, name, page.limit, page.after, view,
+    )
+    return paged_json(result)
+
+
+@router.get("/facets", response_model=OrganizationFacets)
+async def facets(
+    building_ids: Optional[str] = None,
+    page: PageParams = Depends(page_params),
+    db: DbSession = Depends(get_read_db),
+):
     """
-    return organizations.orgs_within_bbox(db, lat_min, lon_min, lat_max, lon_max)
+    Число организаций для каждой активности (вместе с подвидами) и для зданий, от самых заполненных.
+
+    Счётчики хранятся в самих активностях и зданиях и обновляются при создании организаций
+    и переносе активностей, поэтому ответ - одно чтение без подсчёта на лету.
+    Организация, связанная с несколькими подвидами одной активности, учитывается в ней один раз.
+
+    Здания отдаются страницами: не больше `limit` (до `PAGE_SIZE_MAX`) за раз, остальные - по курсору.
+    Счётчики конкретных зданий (например, видимых на карте) можно запросить через `building_ids`.
+
+    **Params**:
+    - **x-api-key (str)**: API-ключ, передаваемый в заголовке запроса. Должен совпадать с ключом из `.env`.
+    - **building_ids (str, optional)**: Только эти здания - ID через запятую (не больше `BATCH_FETCH_MAX_IDS`)
+    - **limit (int, optional)**: Сколько зданий вернуть на странице
+    - **after (str, optional)**: Курсор следующей страницы зданий из заголовка `X-Next-Cursor`
+
+    **Returns**:
+    - **OrganizationFacets**: `activities` - id, name, parent_id и org_count каждой активности (на каждой странице),
+      `buildings` - id и org_count страницы зданий по убыванию org_count, при равенстве - по id.
+      Если есть следующая страница, её курсор - в заголовке `X-Next-Cursor`.
+    """
+    ids = _parse_ids(building_ids, "building_ids") if building_ids is not None else None
+    result, next_cursor = await run_db(db, organizations.get_org_facets, page.limit, page.after, ids)
+    return json_response(result, {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None)
+
+
+@router.get("/export")
+def export_orgs(request: Request, format: Literal["ndjson", "csv"] = "ndjson"):
+    """
+    Выгружает весь каталог организаций потоком, для синхронизации с внешними системами.
+
+    Организации читаются серверным курсором пачками и сразу отдаются клиенту,
+    поэтому память не растёт с размером каталога. На каждую организацию - одна строка
+    с адресом и координатами здания, телефонами и ID активностей.
+
+    **Params**:
+    - **x-api-key (str)**: API-ключ, передаваемый в заголовке запроса. Должен совпадать с ключом из `.env`.
+    - **format (str, optional)**: `ndjson` (по умолчанию) или `csv`
+
+    **Returns**:
+     - Поток NDJSON или CSV. В CSV телефоны и ID активностей перечислены через `;`.
+    """
+    media_type, write = EXPORT_FORMATS[format]
+
+    def stream():
+        # отдельная сессия: поток живёт дольше обработчика запроса
+        with read_session(request) as db:
+            yield from write(db, settings.EXPORT_BATCH_SIZE)
 
+    return StreamingResponse(
+        stream(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="organizations.{format}"'},
+    )
 
 
 @router.get("/{org_id}", response_model=Organization)
-def get_org(org_id: int, db: Session = Depends(get_db)):
+async def get_org(org_id: int, db: DbSession = Depends(get_read_db)):
     """
     Получает организацию по её ID.
 
@@ -133,8 +472,8 @@ def get_org(org_id: int, db: Session = Depends(get_db)):
     **Raises**:
     - **HTTPException**: Если организация не найдена.
     """
-    org = organizations.get_org_by_id(db, org_id)
+    org = await run_db(db, organizations.get_org_by_id, org_id)
     if not org:
         raise HTTPException(status_code=404, detail="Not found")
-    return org
+    return json_response(org)
 
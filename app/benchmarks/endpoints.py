@@ -0,0 +1,227 @@
+"""
+Бенчмарк всех роутеров app/api/v1: приложение поднимается в процессе (TestClient),
+база заполняется синтетическими данными нужного размера, для каждого эндпоинта
+измеряются p50/p99, пропускная способность и число SQL-запросов на вызов.
+Записи (POST) откатываются после каждого запроса, так что база от прогона к прогону не меняется.
+
+    python -m app.benchmarks.endpoints --url sqlite:///bench.db --buildings 2e4 --orgs 6e4 --output results.json
+    python -m app.benchmarks.endpoints --url sqlite:///bench.db --skip-seed --baseline results.json --threshold 0.25
+
+С --baseline результаты сравниваются с сохранёнными, и при регрессии (p50 медленнее
+больше чем на threshold или больше SQL-запросов на вызов) процесс завершается с кодом 1.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="sqlite:///bench.db", help="база для бенчмарка (подменяет DATABASE_URL)")
+    parser.add_argument("--buildings", type=lambda v: int(float(v)), default=20_000)
+    parser.add_argument("--orgs", type=lambda v: int(float(v)), default=60_000)
+    parser.add_argument("--skip-seed", action="store_true", help="база уже заполнена")
+    parser.add_argument("--requests", type=int, default=200, help="вызовов на эндпоинт")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--response-cache", action="store_true", help="не отключать кеш ответов (меряются попадания в кеш)")
+    parser.add_argument("--output", help="сохранить результаты в JSON")
+    parser.add_argument("--baseline", help="JSON с предыдущими результатами для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.25, help="допустимое замедление p50, доля")
+    return parser.parse_args()
+
+
+def prepare_database(url: str, buildings: int, orgs: int):
+    from alembic import command
+    from alembic.config import Config
+    from app.core.db import SessionLocal
+    from app.test_data import generate_data
+
+    if url.startswith("sqlite:///") and os.path.exists(url[len("sqlite:///"):]):
+        os.remove(url[len("sqlite:///"):])
+    command.upgrade(Config("alembic.ini"), "head")
+    with SessionLocal() as db:
+        generate_data(db, buildings, orgs, [12, 6, 4])
+
+
+def rolled_back_db(url: str, *listeners):
+    """
+    Замена get_db для записей: каждый запрос идёт во внешней транзакции, которая откатывается
+    после ответа, а commit в сервисах фиксирует только SAVEPOINT. Созданные бенчмарком строки
+    и счётчики организаций не остаются в базе, и прогоны с --skip-seed меряют тот же набор данных.
+    """
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import Session
+    from app.core.config import settings, to_async_url
+
+    def with_savepoints(e):
+        if e.dialect.name == "sqlite":
+            # pysqlite/aiosqlite начинают транзакцию только перед первой записью, и RELEASE внешнего
+            # SAVEPOINT зафиксировал бы данные: BEGIN выдаётся явно
+            event.listen(e, "connect", lambda dbapi_conn, _: setattr(dbapi_conn, "isolation_level", None))
+            event.listen(e, "begin", lambda conn: conn.exec_driver_sql("BEGIN"))
+        for listener in listeners:
+            event.listen(e, "before_cursor_execute", listener)
+        return e
+
+    if settings.DB_ASYNC:
+        async_engine = create_async_engine(to_async_url(url))
+        with_savepoints(async_engine.sync_engine)
+
+        async def get_async_db():
+            async with async_engine.connect() as conn:
+                outer = await conn.begin()
+                async with AsyncSession(bind=conn, autoflush=False, join_transaction_mode="create_savepoint") as db:
+                    yield db
+                await outer.rollback()
+
+        return get_async_db
+
+    engine = with_savepoints(create_engine(url))
+
+    # синхронная зависимость: FastAPI выполняет её в пуле потоков, как и работу с сессией в run_db
+    def get_sync_db():
+        with engine.connect() as conn:
+            outer = conn.begin()
+            with Session(bind=conn, autoflush=False, join_transaction_mode="create_savepoint") as db:
+                yield db
+            outer.rollback()
+
+    return get_sync_db
+
+
+def pick_targets(db) -> dict[str, tuple[str, str, dict | None]]:
+    """Эндпоинты с параметрами, взятыми из заполненной базы: имя -> (метод, путь, тело)."""
+    from sqlalchemy import select, func
+    from app.models import Activity, Building, Organization
+
+    org = db.execute(select(Organization).order_by(Organization.id).limit(1)).scalar_one()
+    busiest_building = db.execute(
+        select(Organization.building_id).group_by(Organization.building_id).order_by(func.count().desc()).limit(1)
+    ).scalar_one()
+    root_activity = db.execute(select(Activity.id).where(Activity.parent_id.is_(None)).order_by(Activity.id).limit(1)).scalar_one()
+    b = db.get(Building, busiest_building)
+    lat, lon = b.latitude, b.longitude
+    word = org.name.split()[1][:4]
+    return {
+        "buildings.list": ("GET", "/api/v1/buildings/?limit=100", None),
+        "activities.descendants": ("GET", f"/api/v1/activities/{root_activity}/descendants", None),
+        "organizations.get": ("GET", f"/api/v1/organizations/{org.id}", None),
+        "organizations.batch": ("GET", "/api/v1/organizations?ids=" + ",".join(str(org.id + i) for i in range(100)), None),
+        "organizations.by_building": ("GET", f"/api/v1/organizations/by-building/{busiest_building}", None),
+        "organizations.by_activity": ("GET", f"/api/v1/organizations/by-activity/{root_activity}", None),
+        "organizations.search": ("GET", f"/api/v1/organizations/search?name={word}", None),
+        "organizations.within_radius": ("GET", f"/api/v1/organizations/within-radius?lat={lat}&lon={lon}&radius_km=2", None),
+        "organizations.within_bbox": (
+            "GET", f"/api/v1/organizations/within-bbox?lat_min={lat - 0.02}&lon_min={lon - 0.03}&lat_max={lat + 0.02}&lon_max={lon + 0.03}", None,
+        ),
+        "organizations.clusters": (
+            "GET", f"/api/v1/organizations/clusters?lat_min={lat - 0.5}&lon_min={lon - 0.8}&lat_max={lat + 0.5}&lon_max={lon + 0.8}&zoom=10", None,
+        ),
+        "organizations.query": (
+            "GET", f"/api/v1/organizations/query?activity_id={root_activity}&lat={lat}&lon={lon}&radius_km=5&name={word}", None,
+        ),
+        "organizations.nearest": ("GET", f"/api/v1/organizations/nearest?lat={lat}&lon={lon}&k=20", None),
+        # записи - последними: они сбрасывают кеши снимков (откатываются, см. rolled_back_db)
+        "buildings.create": ("POST", "/api/v1/buildings/", {"address": "bench", "latitude": lat, "longitude": lon}),
+        "activities.create": ("POST", "/api/v1/activities/", {"name": "bench", "parent_id": root_activity}),
+        "organizations.create": (
+            "POST", "/api/v1/organizations/",
+            {"name": "bench", "building_id": busiest_building, "phone_numbers": ["8-000"], "activity_ids": [root_activity]},
+        ),
+    }
+
+
+def measure(client, headers, method: str, path: str, body, requests: int, warmup: int, counter: list[int]) -> dict:
+    for _ in range(warmup):
+        client.request(method, path, json=body, headers=headers)
+    timings, queries = [], []
+    started = time.perf_counter()
+    for _ in range(requests):
+        counter[0] = 0
+        t = time.perf_counter()
+        r = client.request(method, path, json=body, headers=headers)
+        timings.append((time.perf_counter() - t) * 1000)
+        queries.append(counter[0])
+        if r.status_code >= 400:
+            raise RuntimeError(f"{method} {path}: {r.status_code} {r.text[:200]}")
+    elapsed = time.perf_counter() - started
+    timings.sort()
+    return {
+        "p50_ms": round(statistics.median(timings), 3),
+        "p99_ms": round(timings[max(int(len(timings) * 0.99) - 1, 0)], 3),
+        "rps": round(requests / elapsed, 1),
+        "queries": max(queries),
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    regressions = []
+    for name, base in baseline.items():
+        cur = results.get(name)
+        if cur is None:
+            continue
+        if cur["p50_ms"] > base["p50_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p50 {base['p50_ms']} -> {cur['p50_ms']} ms")
+        if cur["queries"] > base["queries"]:
+            regressions.append(f"{name}: queries {base['queries']} -> {cur['queries']}")
+    return regressions
+
+
+def main():
+    args = parse_args()
+    # приложение должно подключиться к базе бенчмарка, поэтому импортируем его после подмены
+    os.environ["DATABASE_URL"] = args.url
+    if not args.response_cache:
+        os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    from app.core.config import settings
+    from app.core.db import SessionLocal, engine, async_engine
+    from app.core.deps import get_db
+    from app.main import app
+
+    if not args.skip_seed:
+        prepare_database(args.url, args.buildings, args.orgs)
+
+    counter = [0]
+
+    def count_statement(*_):
+        counter[0] += 1
+
+    for e in (engine, async_engine.sync_engine if async_engine is not None else None):
+        if e is not None:
+            event.listen(e, "before_cursor_execute", count_statement)
+
+    app.dependency_overrides[get_db] = rolled_back_db(args.url, count_statement)
+
+    with SessionLocal() as db:
+        targets = pick_targets(db)
+
+    headers = {"x-api-key": settings.API_KEY}
+    results = {}
+    with TestClient(app) as client:
+        for name, (method, path, body) in targets.items():
+            results[name] = measure(client, headers, method, path, body, args.requests, args.warmup, counter)
+            r = results[name]
+            print(f"{name:<30} p50 {r['p50_ms']:8.2f} ms  p99 {r['p99_ms']:8.2f} ms  {r['rps']:8.1f} req/s  {r['queries']:3d} queries")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print("regressions:", *regressions, sep="\n  ")
+            sys.exit(1)
+        print("no regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Бенчмарк поиска по прямоугольнику: старый скан по latitude/longitude BETWEEN
+против индексированных ячеек buildings.geo_cell.
+
+    python -m app.benchmarks.geo --buildings 1000000 --url sqlite:///bench_geo.db
+
+Заполнение пересоздаёт все таблицы. Без --drop это разрешено только для файла SQLite
+и для базы, чьё имя начинается с BENCH_DB_PREFIX, - чтобы не снести рабочую базу опечаткой в --url.
+"""
+import argparse
+import random
+import statistics
+import time
+
+from sqlalchemy import create_engine, insert, make_url, select
+from sqlalchemy.orm import Session
+
+from app.core.db import Base
+from app.models import Building, Organization
+from app.services.geo import bbox_conditions, geo_cell
+
+# центры городов, вокруг которых кучкуются здания
+CITIES = [(55.75, 37.62), (59.93, 30.34), (56.84, 60.61), (55.03, 82.92), (43.12, 131.89)]
+
+BENCH_DB_PREFIX = "bench"
+
+
+def is_scratch_database(url: str) -> bool:
+    """База, которую можно пересоздать без --drop: файл SQLite или база с префиксом BENCH_DB_PREFIX."""
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite":
+        return True
+    return (url.database or "").startswith(BENCH_DB_PREFIX)
+
+
+def seed(engine, count: int, batch_size: int = 50000):
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    rnd = random.Random(42)
+    with Session(engine) as db:
+        for start in range(0, count, batch_size):
+            rows = []
+            for i in range(start, min(start + batch_size, count)):
+                lat0, lon0 = rnd.choice(CITIES)
+                lat, lon = rnd.gauss(lat0, 0.15), rnd.gauss(lon0, 0.25)
+                rows.append({"id": i + 1, "address": f"building {i + 1}", "latitude": lat, "longitude": lon, "geo_cell": geo_cell(lat, lon)})
+            db.execute(insert(Building), rows)
+            db.execute(insert(Organization), [{"id": r["id"], "name": f"org {r['id']}", "building_id": r["id"]} for r in rows])
+        db.commit()
+
+
+def scan_stmt(lat_min, lon_min, lat_max, lon_max):
+    return select(Organization.id).join(Organization.building).where(
+        Building.latitude.between(lat_min, lat_max),
+        Building.longitude.between(lon_min, lon_max),
+    )
+
+
+def cell_stmt(lat_min, lon_min, lat_max, lon_max):
+    return select(Organization.id).join(Organization.building).where(
+        *bbox_conditions(lat_min, lon_min, lat_max, lon_max)
+    )
+
+
+def run(engine, queries: int, box_deg: float):
+    rnd = random.Random(7)
+    boxes = []
+    for _ in range(queries):
+        lat0, lon0 = rnd.choice(CITIES)
+        lat, lon = rnd.gauss(lat0, 0.1), rnd.gauss(lon0, 0.15)
+        boxes.append((lat, lon, lat + box_deg, lon + box_deg))
+
+    results = {}
+    with Session(engine) as db:
+        for name, make in (("scan", scan_stmt), ("geo_cell", cell_stmt)):
+            timings, rows = [], 0
+            for box in boxes:
+                t = time.perf_counter()
+                rows += len(db.execute(make(*box)).all())
+                timings.append((time.perf_counter() - t) * 1000)
+            timings.sort()
+            results[name] = {
+                "p50_ms": statistics.median(timings),
+                "p95_ms": timings[int(len(timings) * 0.95) - 1],
+                "rows_per_query": rows / len(boxes),
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="sqlite:///bench_geo.db")
+    parser.add_argument("--buildings", type=lambda v: int(float(v)), default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--box-deg", type=float, default=0.05)
+    parser.add_argument("--skip-seed", action="store_true", help="использовать уже заполненную базу")
+    parser.add_argument("--drop", action="store_true", help="разрешить пересоздание таблиц в базе с любым именем")
+    args = parser.parse_args()
+    if not args.skip_seed and not args.drop and not is_scratch_database(args.url):
+        parser.error(
+            f"{make_url(args.url).render_as_string()} is not a SQLite file or a '{BENCH_DB_PREFIX}*' database; "
+            "seeding drops all tables - pass --drop to confirm or --skip-seed"
+        )
+
+    engine = create_engine(args.url, future=True)
+    if not args.skip_seed:
+        t = time.perf_counter()
+        seed(engine, args.buildings)
+        print(f"seeded {args.buildings} buildings in {time.perf_counter() - t:.1f}s")
+    for name, r in run(engine, args.queries, args.box_deg).items():
+        print(f"{name:>9}: p50 {r['p50_ms']:8.2f} ms  p95 {r['p95_ms']:8.2f} ms  rows/query {r['rows_per_query']:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Нагрузочное сравнение запущенных экземпляров API: N параллельных клиентов в течение
+заданного времени ходят по списку эндпоинтов, для каждого --target печатаются
+пропускная способность и задержки.
+
+Сравнение синхронного и асинхронного режима:
+
+    DB_ASYNC=false uvicorn app.main:app --port 8000 --workers 1
+    DB_ASYNC=true  uvicorn app.main:app --port 8001 --workers 1
+    python -m app.benchmarks.load --target http://localhost:8000 --target http://localhost:8001 --concurrency 200
+
+По умолчанию запросы идут с `Cache-Control: no-cache`, и кеш ответов (ResponseCacheMiddleware)
+их пропускает: сравниваются режимы работы с базой, а не попадания в кеш. С --use-cache
+заголовок не отправляется - так меряется производительность с кешем. Выключить кеш на стороне
+сервера целиком можно переменной RESPONSE_CACHE_ENABLED=false.
+"""
+import argparse
+import asyncio
+import itertools
+import statistics
+import time
+
+import httpx
+
+from app.core.config import settings
+
+DEFAULT_PATHS = [
+    "/api/v1/organizations/by-building/1",
+    "/api/v1/organizations/by-activity/1",
+    "/api/v1/organizations/search?name=ООО",
+    "/api/v1/organizations/within-radius?lat=55.75&lon=37.61&radius_km=5",
+    "/api/v1/organizations/nearest?lat=55.75&lon=37.61&k=20",
+    "/api/v1/organizations/1",
+    "/api/v1/activities/1/descendants",
+]
+
+
+async def drive(target: str, paths: list[str], concurrency: int, duration: float, use_cache: bool = False) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    paths_cycle = itertools.cycle(paths)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    headers = {"x-api-key": settings.API_KEY}
+    if not use_cache:
+        headers["cache-control"] = "no-cache"
+    async with httpx.AsyncClient(base_url=target, headers=headers, limits=limits, timeout=30) as client:
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                t = time.perf_counter()
+                try:
+                    r = await client.get(next(paths_cycle))
+                    ok = r.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append((time.perf_counter() - t) * 1000)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) if latencies else 0.0,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", action="append", required=True, help="базовый URL экземпляра API, можно несколько")
+    parser.add_argument("--path", action="append", help="эндпоинт для нагрузки, можно несколько")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--use-cache", action="store_true", help="не обходить кеш ответов сервера")
+    args = parser.parse_args()
+
+    for target in args.target:
+        r = asyncio.run(drive(target, args.path or DEFAULT_PATHS, args.concurrency, args.duration, args.use_cache))
+        print(
+            f"{target}: {r['rps']:8.1f} req/s  p50 {r['p50_ms']:7.1f} ms  p99 {r['p99_ms']:7.1f} ms"
+            f"  ok {r['requests']}  errors {r['errors']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Бенчмарк сериализации списка организаций: прежний путь (ORM-объекты -> pydantic Organization ->
+JSON, как это делает FastAPI по response_model) против быстрого (столбцы -> dict -> orjson, org_rows).
+
+Проверяет, что оба пути дают побайтно одинаковый JSON, и выходит с кодом 1, если это не так.
+Нужна заполненная база (например, python -m app.test_data --buildings 1e4 --orgs 3e4).
+
+    python -m app.benchmarks.serialization --sizes 100,1000,10000
+"""
+import argparse
+import statistics
+import sys
+import time
+from typing import List
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, selectinload
+
+from app.core.db import SessionLocal
+from app.models import Organization
+from app.schemas.organization import Organization as OrganizationSchema
+from app.services.org_rows import org_rows
+
+adapter = TypeAdapter(List[OrganizationSchema])
+
+# прежний путь: связанные данные ORM-объектов грузятся фиксированным числом запросов, без ленивых загрузок
+ORG_LOAD_OPTIONS = (
+    joinedload(Organization.building),
+    selectinload(Organization.phones),
+    selectinload(Organization.activities),
+)
+
+
+def via_schemas(db, ids: list[int]) -> bytes:
+    orgs = db.execute(select(Organization).where(Organization.id.in_(ids)).options(*ORG_LOAD_OPTIONS)).scalars().all()
+    by_id = {org.id: org for org in orgs}
+    models = adapter.validate_python([by_id[i] for i in ids if i in by_id], from_attributes=True)
+    return JSONResponse(jsonable_encoder(models)).body
+
+
+def via_rows(db, ids: list[int]) -> bytes:
+    return orjson.dumps(org_rows(db, ids))
+
+
+def timed(fn, ids: list[int], repeat: int) -> tuple[float, bytes]:
+    timings = []
+    for _ in range(repeat):
+        # новая сессия на каждый прогон: identity map не должна подсказывать ORM-пути
+        with SessionLocal() as db:
+            started = time.perf_counter()
+            body = fn(db, ids)
+            timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,1000,10000")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        all_ids = db.execute(select(Organization.id).where(Organization.building_id.is_not(None)).order_by(Organization.id)).scalars().all()
+
+    identical = True
+    for size in (int(s) for s in args.sizes.split(",")):
+        ids = all_ids[:size]
+        old_ms, old_body = timed(via_schemas, ids, args.repeat)
+        new_ms, new_body = timed(via_rows, ids, args.repeat)
+        same = old_body == new_body
+        identical &= same
+        print(
+            f"{len(ids):>7} orgs  schemas {old_ms:9.1f} ms  rows+orjson {new_ms:9.1f} ms  "
+            f"x{old_ms / new_ms:5.1f}  {len(new_body)} bytes  {'identical' if same else 'DIFFERENT'}"
+        )
+    sys.exit(0 if identical else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,65 @@
 from pydantic_settings import BaseSettings
 
+def to_async_url(url: str) -> str:
+    """Заменяет драйвер в URL на асинхронный (asyncpg / aiosqlite)."""
+    scheme, rest = url.split("://", 1)
+    backend = scheme.split("+", 1)[0]
+    driver = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}.get(backend)
+    return f"{backend}+{driver}://{rest}" if driver else url
+
 class Settings(BaseSettings):
     API_KEY: str
     DATABASE_URL: str
     MAX_ACTIVITY_DEPTH: int = 3
+    ACTIVITY_TREE_CACHE: bool = True
+    CACHE_VERSION_CHECK_INTERVAL: float = 1.0
+    PAGE_SIZE_DEFAULT: int = 100
+    PAGE_SIZE_MAX: int = 1000
+    EXPORT_BATCH_SIZE: int = 1000
+    # /organizations/clusters: потолок числа ячеек в ответе и сколько id отдавать на ячейку
+    CLUSTER_MAX_CELLS: int = 1024
+    CLUSTER_SAMPLE_SIZE: int = 5
+    # самая короткая подстрока для поиска по названию: pg_trgm обслуживает индексом шаблоны от 3 символов
+    NAME_SEARCH_MIN_LENGTH: int = 3
+    # наибольший radius_km в поиске по радиусу
+    MAX_RADIUS_KM: float = 1000.0
+    BULK_IMPORT_MAX_ITEMS: int = 5000
+    # сколько id можно запросить за раз в GET/POST пакетной выборки организаций
+    BATCH_FETCH_MAX_IDS: int = 5000
+    # асинхронный режим: AsyncEngine/AsyncSession вместо блокирующих сессий в пуле потоков
+    DB_ASYNC: bool = False
+    # если не задан, выводится из DATABASE_URL заменой драйвера (asyncpg / aiosqlite)
+    ASYNC_DATABASE_URL: str | None = None
+    # пул соединений (значения по умолчанию - как у SQLAlchemy)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = -1
+    DB_POOL_PRE_PING: bool = False
+    # подключение через pgbouncer (transaction pooling): без серверных prepared statements
+    DB_PGBOUNCER: bool = False
+    # реплики для чтения через запятую; GET-роуты читают с них по кругу, записи идут в DATABASE_URL
+    READ_REPLICA_URLS: str = ""
+    REPLICA_CHECK_INTERVAL: float = 5.0
+    # после записи клиент столько секунд читает с основной базы (cookie), 0 - выключено
+    READ_YOUR_WRITES_SECONDS: float = 0.0
+    # кеш GET-ответов с ETag по версии каталога; RESPONSE_CACHE_BACKEND - "модуль:фабрика" общего хранилища
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1024
+    RESPONSE_CACHE_TTL: float = 300.0
+    RESPONSE_CACHE_MAX_BODY: int = 1_000_000
+    RESPONSE_CACHE_BACKEND: str = ""
+    # метрики запросов: Server-Timing, /metrics и журнал медленных SQL-выражений (логгер app.sql.slow)
+    METRICS_ENABLED: bool = True
+    SLOW_QUERY_THRESHOLD_MS: float = 200.0
+
+    @property
+    def async_database_url(self) -> str:
+        return self.ASYNC_DATABASE_URL or to_async_url(self.DATABASE_URL)
+
+    @property
+    def read_replica_urls(self) -> list[str]:
+        return [url.strip() for url in self.READ_REPLICA_URLS.split(",") if url.strip()]
 
     class Config:
         env_file = ".env"
@@ -1,7 +1,33 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base
-from app.core.config import settings
+from app.core.config import settings, to_async_url
+from app.core.metrics import instrument_engine
+from app.core.pool import engine_options
+from app.core.replicas import ReplicaSet
 
-engine = create_engine(settings.DATABASE_URL, future=True)
+engine = create_engine(settings.DATABASE_URL, future=True, **engine_options(settings.DATABASE_URL, "primary"))
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 Base = declarative_base()
+
+# синхронный движок остаётся и в async-режиме: миграции, заполнение данными, CLI
+async_engine = create_async_engine(
+    settings.async_database_url, **engine_options(settings.async_database_url, "primary_async", is_async=True)
+) if settings.DB_ASYNC else None
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False) if settings.DB_ASYNC else None
+
+# реплики: синхронные движки нужны и в async-режиме - на них работает проверка живости
+replica_engines = [
+    create_engine(url, future=True, **engine_options(url, f"replica{i}")) for i, url in enumerate(settings.read_replica_urls)
+]
+async_replica_engines = [
+    create_async_engine(to_async_url(url), **engine_options(to_async_url(url), f"replica{i}_async", is_async=True))
+    for i, url in enumerate(settings.read_replica_urls)
+] if settings.DB_ASYNC else []
+replicas = ReplicaSet(replica_engines, settings.REPLICA_CHECK_INTERVAL)
+
+if settings.METRICS_ENABLED:
+    for e in [engine, *replica_engines]:
+        instrument_engine(e)
+    for e in [async_engine, *async_replica_engines] if settings.DB_ASYNC else []:
+        instrument_engine(e.sync_engine)
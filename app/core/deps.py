@@ -1,15 +1,97 @@
-from fastapi import Header, HTTPException
+import time
+from functools import lru_cache
+from typing import Any, Callable, Union
+from fastapi import Header, HTTPException, Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from app.core.config import settings
-from app.core.db import SessionLocal
+from app.core.db import SessionLocal, AsyncSessionLocal, replicas, replica_engines, async_replica_engines
+from app.core.replicas import READ_PRIMARY_COOKIE, read_primary_until
 
-def get_db():
+DbSession = Union[Session, AsyncSession]
+
+def _mark_write(response: Response):
+    # read-your-writes: следующие чтения этого клиента какое-то время идут в основную базу
+    if replicas.engines and settings.READ_YOUR_WRITES_SECONDS > 0:
+        until = time.time() + settings.READ_YOUR_WRITES_SECONDS
+        response.set_cookie(
+            READ_PRIMARY_COOKIE, f"{until:.3f}", max_age=int(settings.READ_YOUR_WRITES_SECONDS) + 1, httponly=True
+        )
+
+def _replica_index(request: Request):
+    if settings.READ_YOUR_WRITES_SECONDS > 0 and read_primary_until(request.cookies) > time.time():
+        return None
+    return replicas.pick()
+
+async def _close(db: Session):
+    # сессия создаётся без обращения к базе, а закрытие возвращает соединение в пул с ROLLBACK -
+    # блокирующий вызов, поэтому в пул потоков он уходит, только если соединение было взято
+    if db.in_transaction():
+        await run_in_threadpool(db.close)
+    else:
+        db.close()
+
+# синхронные и асинхронные зависимости - async def: FastAPI не отправляет их в пул потоков,
+# и в синхронном режиме к запросу добавляются только вызовы run_db, как в асинхронном
+async def get_sync_db(response: Response):
+    _mark_write(response)
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
+        await _close(db)
+
+async def get_async_db(response: Response):
+    _mark_write(response)
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def read_session(request: Request) -> Session:
+    """Синхронная сессия для чтения: реплика, если есть живая, иначе основная база."""
+    i = _replica_index(request)
+    return SessionLocal(bind=replica_engines[i]) if i is not None else SessionLocal()
+
+async def get_sync_read_db(request: Request):
+    db = read_session(request)
+    try:
+        yield db
+    finally:
+        await _close(db)
+
+async def get_async_read_db(request: Request):
+    i = _replica_index(request)
+    async with (AsyncSessionLocal(bind=async_replica_engines[i]) if i is not None else AsyncSessionLocal()) as db:
+        yield db
+
+# get_db - основная база (записи), get_read_db - для GET-роутов
+get_db = get_async_db if settings.DB_ASYNC else get_sync_db
+get_read_db = get_async_read_db if settings.DB_ASYNC else get_sync_read_db
+
+@lru_cache
+def _adapter(schema) -> TypeAdapter:
+    return TypeAdapter(schema)
+
+async def run_db(db: DbSession, fn: Callable[..., Any], *args, schema=None):
+    """
+    Вызывает синхронную функцию сервиса `fn(session, *args)` из async-роута.
+
+    С AsyncSession функция выполняется через `run_sync` на асинхронном драйвере, без пула потоков;
+    с обычной Session - в пуле потоков. Если передан `schema`, результат превращается в pydantic-модели
+    там же, пока ленивые загрузки ORM ещё могут обращаться к базе.
+    """
+    def call(session: Session):
+        result = fn(session, *args)
+        if schema is not None:
+            result = _adapter(schema).validate_python(result, from_attributes=True)
+        return result
+
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(call)
+    return await run_in_threadpool(call, db)
 
-def require_api_key(x_api_key: str = Header(...)):
+async def require_api_key(x_api_key: str = Header(...)):
     print("Loaded API_KEY:", settings.API_KEY)
     if x_api_key != settings.API_KEY:
         raise HTTPException(status_code=401, detail="invalid API key")
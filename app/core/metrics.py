@@ -0,0 +1,189 @@
+import json
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+
+slow_query_log = logging.getLogger("app.sql.slow")
+
+# границы бакетов гистограмм, секунды
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+@dataclass
+class RequestStats:
+    """Статистика текущего запроса: время в базе и число SQL-выражений."""
+    scope: Optional[dict] = None
+    db_time: float = 0.0
+    statements: int = 0
+
+    @property
+    def route(self) -> str:
+        return _route(self.scope) if self.scope is not None else "unmatched"
+
+
+# объект общий для всех потоков/гринлетов, в которые копируется контекст запроса
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...], buckets: tuple[float, ...] = BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, buckets
+        self._series: dict[tuple, list] = {}  # labels -> [counts по бакетам..., count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {k: list(v) for k, v in self._series.items()}
+        for label_values, series in sorted(snapshot.items()):
+            labels = ",".join(f'{k}="{v}"' for k, v in zip(self.labels, label_values))
+            cumulative = 0
+            for bound, n in zip(self.buckets, series):
+                cumulative += n
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            cumulative += series[len(self.buckets)]
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {cumulative}')
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+            lines.append(f"{self.name}_sum{{{labels}}} {series[-1]:.6f}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...]):
+        self.name, self.help, self.labels = name, help, labels
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float, *label_values: str):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = sorted(self._values.items())
+        for label_values, value in snapshot:
+            labels = ",".join(f'{k}="{v}"' for k, v in zip(self.labels, label_values))
+            lines.append(f"{self.name}{{{labels}}} {value:g}")
+        return lines
+
+
+request_duration = Histogram("http_request_duration_seconds", "Wall time of HTTP requests", ("method", "route"))
+request_db_time = Histogram("http_request_db_seconds", "Time spent in SQL per HTTP request", ("method", "route"))
+request_statements = Counter("http_request_db_statements_total", "SQL statements executed by HTTP requests", ("method", "route"))
+requests_total = Counter("http_requests_total", "HTTP requests by status", ("method", "route", "status"))
+
+# дополнительные источники метрик (например, пул соединений): функции, возвращающие строки формата Prometheus
+collectors: list[Callable[[], list[str]]] = []
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in (request_duration, request_db_time, request_statements, requests_total):
+        lines += metric.render()
+    for collect in collectors:
+        lines += collect()
+    return "\n".join(lines) + "\n"
+
+
+# развёрнутые списки IN (?, ?, ...) сворачиваются, чтобы журнал оставался читаемым
+_IN_LIST = re.compile(r"\?(, \?)+")
+
+
+# время старта хранится в контексте выполнения: у упавшего выражения after_cursor_execute не вызывается,
+# и запись в conn.info осталась бы на соединении навсегда; контекст же уходит вместе с выражением
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_start
+    stats = current_request.get()
+    if stats is not None:
+        stats.db_time += elapsed
+        stats.statements += 1
+    if elapsed * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+        slow_query_log.warning(json.dumps({
+            "event": "slow_query",
+            "duration_ms": round(elapsed * 1000, 3),
+            "route": stats.route if stats is not None else None,
+            "statement": _IN_LIST.sub("?, ...", " ".join(statement.split()))[:2000],
+            "executemany": executemany,
+        }, ensure_ascii=False))
+
+
+def instrument_engine(engine: Engine):
+    """Подключает замер времени SQL-выражений к движку (для AsyncEngine - к его sync_engine)."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware: меряет время запроса, время в базе и число SQL-выражений,
+    добавляет заголовок Server-Timing и пишет всё в гистограммы /metrics.
+    Метка route - шаблон пути (`/api/v1/organizations/{org_id}`), а не сам путь.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        stats = RequestStats(scope)
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                total_ms = (time.perf_counter() - started) * 1000
+                timing = f'app;dur={total_ms:.1f}, db;dur={stats.db_time * 1000:.1f};desc="{stats.statements} statements"'
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", timing.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_request.reset(token)
+            method, route = scope["method"], stats.route
+            request_duration.observe(time.perf_counter() - started, method, route)
+            request_db_time.observe(stats.db_time, method, route)
+            request_statements.inc(stats.statements, method, route)
+            requests_total.inc(1, method, route, str(status))
+
+
+def _route(scope) -> str:
+    route = scope.get("route")
+    path_format = getattr(route, "path_format", None)
+    if path_format is None:
+        return "unmatched"
+    # в зависимости от версии FastAPI route.path может не содержать префикс роутера -
+    # восстанавливаем его по фактическому пути запроса
+    filled = path_format.format(**{k: str(v) for k, v in scope.get("path_params", {}).items()})
+    path = scope["path"]
+    if not filled:
+        # роут с пустым путём ("" под префиксом роутера): параметров нет, шаблон - сам путь
+        return path
+    prefix = path[:-len(filled)] if path.endswith(filled) else ""
+    return prefix + path_format
@@ -0,0 +1,74 @@
+import base64
+import json
+from typing import Any, Callable, Generic, Optional, Sequence, TypeVar
+from fastapi import Query, Response
+from pydantic import BaseModel
+from app.core.config import settings
+from app.core.responses import json_response
+
+T = TypeVar("T")
+
+# Курсорная (keyset) пагинация: курсор - непрозрачная строка с ключом сортировки
+# последней отданной записи, следующая страница начинается строго после него.
+# Поэтому глубокие страницы не дороже первой, в отличие от OFFSET.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class Page(BaseModel, Generic[T]):
+    items: list[T]
+    next_cursor: Optional[str] = None
+
+
+class PageParams(BaseModel):
+    limit: int
+    after: Optional[str] = None
+
+
+def page_params(
+    limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX, description="Размер страницы"),
+    after: Optional[str] = Query(None, description=f"Курсор из заголовка {NEXT_CURSOR_HEADER} предыдущей страницы"),
+) -> PageParams:
+    return PageParams(limit=limit, after=after)
+
+
+def encode_cursor(*key) -> str:
+    raw = json.dumps(key, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types: type) -> tuple:
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError as e:
+        raise InvalidCursor("invalid cursor") from e
+    if not isinstance(key, list) or len(key) != len(types):
+        raise InvalidCursor("invalid cursor")
+    for value, type_ in zip(key, types):
+        if type_ is float and isinstance(value, int):
+            continue
+        if not isinstance(value, type_) or isinstance(value, bool):
+            raise InvalidCursor("invalid cursor")
+    return tuple(key)
+
+
+def paginate(rows: Sequence[T], limit: int, key: Callable[[T], tuple]) -> Page:
+    # rows выбраны с запасом в одну запись: по ней видно, есть ли следующая страница
+    if len(rows) <= limit:
+        return Page(items=list(rows))
+    items = list(rows[:limit])
+    return Page(items=items, next_cursor=encode_cursor(*key(items[-1])))
+
+
+def paged(response: Response, page: Page) -> list[Any]:
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    return page.items
+
+
+def paged_json(page: Page) -> Response:
+    # как paged, но items - готовые dict, которые сразу кодируются в JSON
+    return json_response(page.items, {NEXT_CURSOR_HEADER: page.next_cursor} if page.next_cursor else None)
@@ -0,0 +1,85 @@
+import time
+from uuid import uuid4
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from app.core.config import settings
+from app.core.metrics import Counter, Histogram, collectors
+
+pool_checkout = Histogram("db_pool_checkout_seconds", "Time to check a connection out of the pool", ("pool",))
+pool_timeouts = Counter("db_pool_timeouts_total", "Checkouts that failed with pool timeout", ("pool",))
+
+# пулы по имени (pool_logging_name); после dispose() SQLAlchemy пересоздаёт пул, и в реестр попадает новый
+_pools: dict[str, QueuePool] = {}
+
+
+class _TimedPoolMixin:
+    """Замер ожидания соединения: время connect() включает очередь, открытие соединения и pre-ping."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        _pools[self._label] = self
+
+    @property
+    def _label(self) -> str:
+        return self._orig_logging_name or "default"
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            pool_timeouts.inc(1, self._label)
+            raise
+        finally:
+            pool_checkout.observe(time.perf_counter() - started, self._label)
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options(url: str, name: str, is_async: bool = False) -> dict:
+    """Аргументы create_engine/create_async_engine для пула из настроек DB_POOL_*."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        # база в памяти живёт в одном соединении - пул по умолчанию (SingletonThreadPool/StaticPool)
+        return {}
+    options = {
+        "poolclass": TimedAsyncQueuePool if is_async else TimedQueuePool,
+        "pool_logging_name": name,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if settings.DB_PGBOUNCER and parsed.get_driver_name() == "asyncpg":
+        # pgbouncer в режиме transaction отдаёт каждую транзакцию любому серверному соединению,
+        # поэтому именованные prepared statements asyncpg конфликтуют: отключаем кеши и делаем имена уникальными
+        options["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    return options
+
+
+def _collect_pool_stats() -> list[str]:
+    lines = []
+    for metric, help, value in (
+        ("db_pool_size", "Configured pool size", lambda p: p.size()),
+        ("db_pool_checked_out", "Connections currently checked out", lambda p: p.checkedout()),
+        ("db_pool_checked_in", "Idle connections in the pool", lambda p: p.checkedin()),
+        ("db_pool_overflow", "Connections opened above pool_size", lambda p: max(p.overflow(), 0)),
+    ):
+        lines += [f"# HELP {metric} {help}", f"# TYPE {metric} gauge"]
+        lines += [f'{metric}{{pool="{name}"}} {value(pool)}' for name, pool in sorted(_pools.items())]
+    return lines + pool_checkout.render() + pool_timeouts.render()
+
+
+collectors.append(_collect_pool_stats)
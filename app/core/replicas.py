@@ -0,0 +1,76 @@
+import itertools
+import logging
+import threading
+import time
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+log = logging.getLogger(__name__)
+
+# cookie, по которой клиент после записи какое-то время читает с основной базы
+READ_PRIMARY_COOKIE = "read_primary_until"
+
+
+class ReplicaSet:
+    """
+    Реплики для чтения: выбор по кругу среди живых.
+
+    Живость проверяет фоновый поток (`SELECT 1` раз в check_interval секунд, запускается при первом выборе);
+    упавшая реплика выпадает из ротации до следующей успешной проверки. Если живых реплик нет,
+    pick() возвращает None, и чтение идёт в основную базу.
+    """
+
+    def __init__(self, engines: list[Engine], check_interval: float):
+        self.engines = engines
+        self.check_interval = check_interval
+        self._healthy = [True] * len(engines)
+        self._counter = itertools.count()
+        self._started = False
+        self._lock = threading.Lock()
+
+    def pick(self) -> Optional[int]:
+        """Индекс реплики для следующего чтения."""
+        if not self.engines:
+            return None
+        if not self._started:
+            self._start()
+        n = len(self.engines)
+        start = next(self._counter)
+        for i in range(start, start + n):
+            if self._healthy[i % n]:
+                return i % n
+        return None
+
+    def _start(self):
+        with self._lock:
+            if self._started:
+                return
+            threading.Thread(target=self._check_loop, name="replica-health", daemon=True).start()
+            self._started = True
+
+    def check(self):
+        for i, engine in enumerate(self.engines):
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+                healthy = True
+            except Exception as e:
+                healthy = False
+                if self._healthy[i]:
+                    log.warning("read replica %s is down: %s", engine.url.render_as_string(hide_password=True), e)
+            if healthy and not self._healthy[i]:
+                log.warning("read replica %s is back", engine.url.render_as_string(hide_password=True))
+            self._healthy[i] = healthy
+
+    def _check_loop(self):
+        while True:
+            time.sleep(self.check_interval)
+            self.check()
+
+
+def read_primary_until(cookies: dict) -> float:
+    try:
+        return float(cookies.get(READ_PRIMARY_COOKIE, 0))
+    except ValueError:
+        return 0.0
@@ -0,0 +1,219 @@
+import importlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Protocol
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from app.core.config import settings
+from app.core.deps import read_session
+from app.core.metrics import Counter, collectors
+from app.core.replicas import read_primary_until
+from app.services.versions import get_catalog_version
+
+cache_results = Counter("http_response_cache_total", "Response cache lookups by result", ("result",))
+collectors.append(cache_results.render)
+
+# потоковая выгрузка всего каталога в кеш не попадает
+NOT_CACHED_PATHS = ("/api/v1/organizations/export",)
+# методы записи: после успешного ответа версия каталога перечитывается
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+# POST-запросы, которые только читают: после них версия каталога не сбрасывается
+READ_ONLY_POSTS = ("/api/v1/organizations/batch",)
+# заголовки ответа, которые сохраняются вместе с телом
+CACHED_HEADERS = (b"content-type", b"x-next-cursor")
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    status: int
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+
+
+class CacheBackend(Protocol):
+    """Хранилище ответов. Методы асинхронные, чтобы за ним мог стоять общий кеш (Redis и т.п.)."""
+
+    async def get(self, key: str) -> Optional[CachedResponse]: ...
+
+    async def set(self, key: str, value: CachedResponse, ttl: float) -> None: ...
+
+
+class LRUCache:
+    """Процессный кеш: не больше max_entries ответов, каждый живёт ttl секунд."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._items: OrderedDict[str, tuple[float, CachedResponse]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            if item[0] < time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return item[1]
+
+    async def set(self, key: str, value: CachedResponse, ttl: float) -> None:
+        with self._lock:
+            self._items[key] = (time.monotonic() + ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+
+def load_backend() -> CacheBackend:
+    # RESPONSE_CACHE_BACKEND="package.module:factory" - фабрика без аргументов, возвращающая CacheBackend
+    if not settings.RESPONSE_CACHE_BACKEND:
+        return LRUCache(settings.RESPONSE_CACHE_MAX_ENTRIES)
+    module, _, attr = settings.RESPONSE_CACHE_BACKEND.partition(":")
+    return getattr(importlib.import_module(module), attr)()
+
+
+class CatalogVersion:
+    """
+    Версия каталога (сумма catalog_versions), перечитывается не чаще раза в check_interval секунд.
+    Записи через этот процесс сбрасывают её сразу, записи других воркеров видны не позже чем через интервал.
+    """
+
+    def __init__(self, check_interval: float):
+        self.check_interval = check_interval
+        self._value: Optional[int] = None
+        self._checked_at = 0.0
+
+    async def get(self, scope) -> int:
+        if self._value is None or time.monotonic() - self._checked_at >= self.check_interval:
+            checked_at = time.monotonic()
+            self._value = await run_in_threadpool(self._load, Request(scope))
+            self._checked_at = checked_at
+        return self._value
+
+    @staticmethod
+    def _load(request: Request) -> int:
+        # версия читается оттуда же, откуда читают GET-роуты, чтобы не опередить реплику
+        with read_session(request) as db:
+            return get_catalog_version(db)
+
+    def invalidate(self):
+        self._checked_at = 0.0
+
+
+def _matches(if_none_match: Optional[bytes], etag: bytes) -> bool:
+    return bool(if_none_match) and any(tag.strip().removeprefix(b"W/") in (etag, b"*") for tag in if_none_match.split(b","))
+
+
+async def _send_not_modified(send, etag: bytes):
+    await send({"type": "http.response.start", "status": 304, "headers": [(b"etag", etag)]})
+    await send({"type": "http.response.body", "body": b""})
+
+
+class ResponseCacheMiddleware:
+    """
+    Кеш GET-ответов /api/v1 с ETag.
+
+    Ключ - версия каталога, путь и отсортированные query-параметры, так что после любой
+    записи старые ответы просто перестают находиться. ETag - та же версия, он ставится только
+    на ответы 200: запрос с совпадающим If-None-Match получает 304 без обращения к базе, если ответ
+    есть в кеше, иначе - после того как роут ответил 200. API-ключ проверяется до чтения из кеша.
+    Запрос с `Cache-Control: no-cache` идёт мимо кеша (нагрузочные тесты базы).
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.backend = load_backend()
+        self.version = CatalogVersion(settings.CACHE_VERSION_CHECK_INTERVAL)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith("/api/v1/"):
+            return await self.app(scope, receive, send)
+        if scope["method"] in WRITE_METHODS and scope["path"] not in READ_ONLY_POSTS:
+            return await self._write(scope, receive, send)
+        if scope["method"] != "GET":
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        if b"no-cache" in headers.get(b"cache-control", b"").lower():
+            cache_results.inc(1, "bypass")
+            return await self.app(scope, receive, send)
+        if (
+            scope["path"] in NOT_CACHED_PATHS
+            or headers.get(b"x-api-key", b"").decode("latin-1") != settings.API_KEY
+            or self._reads_primary(scope)
+        ):
+            return await self.app(scope, receive, send)
+
+        version = await self.version.get(scope)
+        etag = f'"{version}"'.encode()
+        not_modified = _matches(headers.get(b"if-none-match"), etag)
+
+        query = "&".join(sorted(scope.get("query_string", b"").decode("latin-1").split("&")))
+        key = f"{version}:{scope['path']}?{query}"
+        cached = await self.backend.get(key)
+        if cached is not None:
+            if not_modified:
+                cache_results.inc(1, "not_modified")
+                return await _send_not_modified(send, etag)
+            cache_results.inc(1, "hit")
+            await send({"type": "http.response.start", "status": cached.status, "headers": cached.headers})
+            await send({"type": "http.response.body", "body": cached.body})
+            return
+
+        cache_results.inc(1, "miss")
+        start, chunks, size = None, [], 0
+
+        async def capture(message):
+            nonlocal start, chunks, size, not_modified
+            if message["type"] == "http.response.start":
+                start = message
+                # ошибки и прочие статусы отдаются как есть: без ETag и без 304
+                if message["status"] != 200:
+                    not_modified = False
+                    chunks = None
+                else:
+                    message["headers"] = list(message.get("headers", [])) + [(b"etag", etag)]
+                    if not_modified:
+                        await send({"type": "http.response.start", "status": 304, "headers": [(b"etag", etag)]})
+                        return
+            elif message["type"] == "http.response.body":
+                if chunks is not None:
+                    size += len(message.get("body", b""))
+                    if size > settings.RESPONSE_CACHE_MAX_BODY:
+                        chunks = None
+                    else:
+                        chunks.append(message.get("body", b""))
+                        if not message.get("more_body", False):
+                            await self._store(key, start, b"".join(chunks))
+                if not_modified:
+                    # тело 200 ушло только в кеш, клиенту - пустое тело 304
+                    if not message.get("more_body", False):
+                        await send({"type": "http.response.body", "body": b""})
+                    return
+            await send(message)
+
+        await self.app(scope, receive, capture)
+
+    async def _store(self, key: str, start, body: bytes):
+        names = {name for name, _ in start["headers"]}
+        if start["status"] != 200 or b"set-cookie" in names:
+            return
+        headers = [(k, v) for k, v in start["headers"] if k in CACHED_HEADERS or k == b"etag"]
+        headers.append((b"content-length", str(len(body)).encode()))
+        await self.backend.set(key, CachedResponse(200, headers, body), settings.RESPONSE_CACHE_TTL)
+
+    async def _write(self, scope, receive, send):
+        async def track(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                # запись закоммичена до ответа: следующий GET перечитает версию каталога
+                self.version.invalidate()
+            await send(message)
+
+        await self.app(scope, receive, track)
+
+    @staticmethod
+    def _reads_primary(scope) -> bool:
+        # клиент в окне read-your-writes читает с основной базы - общий кеш ему не подходит
+        return settings.READ_YOUR_WRITES_SECONDS > 0 and read_primary_until(Request(scope).cookies) > time.time()
@@ -0,0 +1,12 @@
+from typing import Any, Mapping, Optional
+import orjson
+from fastapi import Response
+
+def json_response(content: Any, headers: Optional[Mapping[str, str]] = None) -> Response:
+    """
+    JSON-ответ из готовых dict/list, закодированный orjson.
+
+    FastAPI не валидирует возвращённый Response по response_model, поэтому данные должны
+    уже иметь форму схемы (см. app.services.org_rows).
+    """
+    return Response(orjson.dumps(content), media_type="application/json", headers=headers)
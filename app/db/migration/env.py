@@ -1,6 +1,6 @@
 from logging.config import fileConfig
 
-from sqlalchemy import engine_from_config
+from sqlalchemy import engine_from_config, make_url
 from sqlalchemy import pool
 
 from alembic import context
@@ -25,6 +25,19 @@ if config.config_file_name is not None:
 config.set_main_option("sqlalchemy.url", settings.DATABASE_URL)
 target_metadata = Base.metadata
 
+
+def include_object_for(dialect_name: str):
+    # объекты с ddl_if(dialect=...) (GIN-индекс pg_trgm) есть только на своей СУБД -
+    # на остальных autogenerate не должен предлагать их создать
+    def include_object(obj, name, type_, reflected, compare_to):
+        ddl_if = getattr(obj, "_ddl_if", None)
+        if ddl_if is not None and ddl_if.dialect is not None:
+            dialects = (ddl_if.dialect,) if isinstance(ddl_if.dialect, str) else ddl_if.dialect
+            return dialect_name in dialects
+        return True
+
+    return include_object
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -47,6 +60,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object_for(make_url(url).get_backend_name()),
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -70,7 +84,9 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object_for(connection.dialect.name),
         )
 
         with context.begin_transaction():
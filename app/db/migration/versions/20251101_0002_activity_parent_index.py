@@ -0,0 +1,24 @@
+"""activity parent index
+
+Revision ID: 20251101_0002
+Revises: 20251022_0001
+Create Date: 2025-11-01 10:12:40.118204
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "20251101_0002"
+down_revision = "20251022_0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # рекурсивный шаг CTE в get_activity_descendants ищет детей по parent_id
+    op.create_index("ix_activities_parent_id", "activities", ["parent_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_activities_parent_id", table_name="activities")
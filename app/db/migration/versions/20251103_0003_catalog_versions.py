@@ -0,0 +1,29 @@
+"""catalog versions
+
+Revision ID: 20251103_0003
+Revises: 20251101_0002
+Create Date: 2025-11-03 12:41:05.630917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20251103_0003"
+down_revision = "20251101_0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    versions = op.create_table(
+        "catalog_versions",
+        sa.Column("name", sa.String(), primary_key=True),
+        sa.Column("version", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.bulk_insert(versions, [{"name": "activities", "version": 0}])
+
+
+def downgrade() -> None:
+    op.drop_table("catalog_versions")
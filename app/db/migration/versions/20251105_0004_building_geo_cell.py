@@ -0,0 +1,67 @@
+"""building geo cell
+
+Revision ID: 20251105_0004
+Revises: 20251103_0003
+Create Date: 2025-11-05 15:08:27.902114
+
+"""
+import math
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20251105_0004"
+down_revision = "20251103_0003"
+branch_labels = None
+depends_on = None
+
+# должны совпадать с app/services/geo.py на момент миграции
+GEO_CELL_SIZE = 0.01
+GEO_CELL_COLUMNS = 36001
+BATCH_SIZE = 10000
+
+
+def upgrade() -> None:
+    op.add_column("buildings", sa.Column("geo_cell", sa.Integer(), nullable=True))
+
+    buildings = sa.table(
+        "buildings",
+        sa.column("id", sa.Integer),
+        sa.column("latitude", sa.Float),
+        sa.column("longitude", sa.Float),
+        sa.column("geo_cell", sa.Integer),
+    )
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(buildings.c.id, buildings.c.latitude, buildings.c.longitude)
+            .where(buildings.c.id > last_id)
+            .order_by(buildings.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        conn.execute(
+            buildings.update().where(buildings.c.id == sa.bindparam("b_id")).values(geo_cell=sa.bindparam("b_cell")),
+            [
+                {
+                    "b_id": id_,
+                    "b_cell": math.floor((lat + 90) / GEO_CELL_SIZE) * GEO_CELL_COLUMNS + math.floor((lon + 180) / GEO_CELL_SIZE),
+                }
+                for id_, lat, lon in rows
+            ],
+        )
+        last_id = rows[-1].id
+
+    op.create_index("ix_buildings_geo_cell", "buildings", ["geo_cell"])
+    # без него JOIN от найденных зданий к организациям снова превращается в скан organizations
+    op.create_index("ix_organizations_building_id", "organizations", ["building_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_organizations_building_id", table_name="organizations")
+    op.drop_index("ix_buildings_geo_cell", table_name="buildings")
+    op.drop_column("buildings", "geo_cell")
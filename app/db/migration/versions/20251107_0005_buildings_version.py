@@ -0,0 +1,25 @@
+"""buildings version
+
+Revision ID: 20251107_0005
+Revises: 20251105_0004
+Create Date: 2025-11-07 11:24:53.570391
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20251107_0005"
+down_revision = "20251105_0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    versions = sa.table("catalog_versions", sa.column("name", sa.String), sa.column("version", sa.Integer))
+    op.bulk_insert(versions, [{"name": "buildings", "version": 0}])
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM catalog_versions WHERE name = 'buildings'")
@@ -0,0 +1,38 @@
+"""organization name trigram index
+
+Revision ID: 20251110_0006
+Revises: 20251107_0005
+Create Date: 2025-11-10 17:46:02.214839
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20251110_0006"
+down_revision = "20251107_0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    versions = sa.table("catalog_versions", sa.column("name", sa.String), sa.column("version", sa.Integer))
+    op.bulk_insert(versions, [{"name": "organizations", "version": 0}])
+
+    # на других СУБД поиск идёт через n-граммный индекс в памяти (app/services/name_search.py)
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.create_index(
+            "ix_organizations_name_trgm",
+            "organizations",
+            ["name"],
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_index("ix_organizations_name_trgm", table_name="organizations")
+    op.execute("DELETE FROM catalog_versions WHERE name = 'organizations'")
@@ -0,0 +1,37 @@
+"""missing indexes
+
+Revision ID: 20251112_0007
+Revises: 20251110_0006
+Create Date: 2025-11-12 11:24:51.630482
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20251112_0007"
+down_revision = "20251110_0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # телефоны грузятся пачкой по organization_id в порядке id; на Postgres number в INCLUDE,
+    # чтобы запрос читал только индекс
+    op.create_index(
+        "ix_phones_organization_id_id", "phones", ["organization_id", "id"], postgresql_include=["number"]
+    )
+    # первичный ключ org_activity начинается с organization_id и не помогает by-activity
+    op.create_index("ix_org_activity_activity_id", "org_activity", ["activity_id", "organization_id"])
+    # by-building листает страницы WHERE building_id = ? AND id > ? ORDER BY id - составной индекс
+    # отдаёт их без сортировки и заменяет одиночный по building_id
+    op.create_index("ix_organizations_building_id_id", "organizations", ["building_id", "id"])
+    op.drop_index("ix_organizations_building_id", table_name="organizations")
+
+
+def downgrade() -> None:
+    op.create_index("ix_organizations_building_id", "organizations", ["building_id"])
+    op.drop_index("ix_organizations_building_id_id", table_name="organizations")
+    op.drop_index("ix_org_activity_activity_id", table_name="org_activity")
+    op.drop_index("ix_phones_organization_id_id", table_name="phones")
@@ -0,0 +1,58 @@
+"""activity depth and materialized path
+
+Revision ID: 20251114_0008
+Revises: 20251112_0007
+Create Date: 2025-11-14 10:42:17.318056
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20251114_0008"
+down_revision = "20251112_0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("activities", sa.Column("depth", sa.Integer(), nullable=True))
+    op.add_column("activities", sa.Column("path", sa.String(), nullable=True))
+
+    activities = sa.table(
+        "activities",
+        sa.column("id", sa.Integer),
+        sa.column("parent_id", sa.Integer),
+        sa.column("depth", sa.Integer),
+        sa.column("path", sa.String),
+    )
+    # путь и глубина всех узлов одним выражением: рекурсивный CTE от корней вниз
+    child = activities.alias("child")
+    tree = sa.select(
+        activities.c.id,
+        sa.literal(1).label("depth"),
+        ("/" + sa.cast(activities.c.id, sa.String) + "/").label("path"),
+    ).where(activities.c.parent_id.is_(None)).cte("tree", recursive=True)
+    tree = tree.union_all(
+        sa.select(child.c.id, tree.c.depth + 1, tree.c.path + sa.cast(child.c.id, sa.String) + "/")
+        .join(tree, child.c.parent_id == tree.c.id)
+    )
+    op.execute(
+        activities.update()
+        .where(activities.c.id == tree.c.id)
+        .values(depth=tree.c.depth, path=tree.c.path)
+        .add_cte(tree)
+    )
+
+    with op.batch_alter_table("activities") as batch:
+        batch.alter_column("depth", existing_type=sa.Integer(), nullable=False)
+        batch.alter_column("path", existing_type=sa.String(), nullable=False)
+    op.create_index("ix_activities_path", "activities", ["path"], postgresql_ops={"path": "text_pattern_ops"})
+
+
+def downgrade() -> None:
+    op.drop_index("ix_activities_path", table_name="activities")
+    with op.batch_alter_table("activities") as batch:
+        batch.drop_column("path")
+        batch.drop_column("depth")
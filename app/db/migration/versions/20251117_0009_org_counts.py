@@ -0,0 +1,51 @@
+"""organization counts per activity subtree and building
+
+Revision ID: 20251117_0009
+Revises: 20251114_0008
+Create Date: 2025-11-17 16:05:39.470912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20251117_0009"
+down_revision = "20251114_0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("activities", sa.Column("org_count", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column("buildings", sa.Column("org_count", sa.Integer(), nullable=False, server_default="0"))
+
+    activities = sa.table("activities", sa.column("id", sa.Integer), sa.column("path", sa.String), sa.column("org_count", sa.Integer))
+    buildings = sa.table("buildings", sa.column("id", sa.Integer), sa.column("org_count", sa.Integer))
+    organizations = sa.table("organizations", sa.column("id", sa.Integer), sa.column("building_id", sa.Integer))
+    org_activity = sa.table("org_activity", sa.column("organization_id", sa.Integer), sa.column("activity_id", sa.Integer))
+
+    op.execute(
+        buildings.update().values(
+            org_count=sa.select(sa.func.count())
+            .where(organizations.c.building_id == buildings.c.id)
+            .scalar_subquery()
+        )
+    )
+    # организация считается в узле один раз, даже если связана с несколькими активностями его поддерева
+    descendant = activities.alias("descendant")
+    op.execute(
+        activities.update().values(
+            org_count=sa.select(sa.func.count(sa.distinct(org_activity.c.organization_id)))
+            .select_from(descendant.join(org_activity, org_activity.c.activity_id == descendant.c.id))
+            .where(descendant.c.path.startswith(activities.c.path))
+            .scalar_subquery()
+        )
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("buildings") as batch:
+        batch.drop_column("org_count")
+    with op.batch_alter_table("activities") as batch:
+        batch.drop_column("org_count")
@@ -0,0 +1,60 @@
+"""
+Массовая загрузка организаций из NDJSON-файла (по объекту OrganizationCreate на строку).
+
+    python -m app.import_data partners.ndjson --batch-size 5000
+    cat partners.ndjson | python -m app.import_data -
+"""
+import argparse
+import sys
+import time
+from itertools import islice
+from pydantic import ValidationError
+from app.core.db import SessionLocal
+from app.schemas.organization import OrganizationCreate
+from app.services.organizations import bulk_create_organizations
+
+
+def import_file(lines, batch_size: int) -> tuple[int, int]:
+    created = failed = 0
+    line_no = 0
+    db = SessionLocal()
+    try:
+        while batch := list(islice(lines, batch_size)):
+            orgs, numbers = [], []
+            for line in batch:
+                line_no += 1
+                if not line.strip():
+                    continue
+                try:
+                    orgs.append(OrganizationCreate.model_validate_json(line).model_dump())
+                    numbers.append(line_no)
+                except ValidationError as e:
+                    failed += 1
+                    print(f"line {line_no}: {e.errors()[0]['msg']}", file=sys.stderr)
+            ids, errors = bulk_create_organizations(db, orgs)
+            for i, detail in errors:
+                print(f"line {numbers[i]}: {detail}", file=sys.stderr)
+            created += sum(1 for id_ in ids if id_ is not None)
+            failed += len(errors)
+    finally:
+        db.close()
+    return created, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="NDJSON-файл или - для stdin")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.path == "-":
+        created, failed = import_file(sys.stdin, args.batch_size)
+    else:
+        with open(args.path, encoding="utf-8") as f:
+            created, failed = import_file(f, args.batch_size)
+    print(f"created {created}, failed {failed} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,45 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, PlainTextResponse
 from app.api.v1 import buildings, activities, organizations
+from app.core.config import settings
+from app.core.metrics import MetricsMiddleware, render_metrics
+from app.core.pagination import InvalidCursor
+from app.services.geo import InvalidCoordinates
+from app.core.response_cache import ResponseCacheMiddleware
+from app.core.responses import json_response
 
 app = FastAPI(title="Organizations Catalog API", version="1.0")
 
+@app.exception_handler(InvalidCursor)
+async def invalid_cursor_handler(request: Request, exc: InvalidCursor):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+@app.exception_handler(RequestValidationError)
+async def validation_error_handler(request: Request, exc: RequestValidationError):
+    # ошибка повторяет ввод, а в JSON-теле могут быть NaN/Infinity: стандартный обработчик
+    # падает на них при сериализации, orjson записывает их как null
+    response = json_response({"detail": jsonable_encoder(exc.errors())})
+    response.status_code = 422
+    return response
+
+@app.exception_handler(InvalidCoordinates)
+async def invalid_coordinates_handler(request: Request, exc: InvalidCoordinates):
+    return JSONResponse(status_code=422, content={"detail": str(exc)})
+
 app.include_router(buildings.router, prefix="/api/v1/buildings", tags=["Buildings"])
 app.include_router(activities.router, prefix="/api/v1/activities", tags=["Activities"])
 app.include_router(organizations.router, prefix="/api/v1/organizations", tags=["Organizations"])
+
+if settings.RESPONSE_CACHE_ENABLED:
+    app.add_middleware(ResponseCacheMiddleware)
+
+# добавленный последним middleware - внешний: в метрики попадают и ответы из кеша
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        """Метрики в текстовом формате Prometheus."""
+        return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -3,3 +3,4 @@ from app.models.building import Building
 from app.models.activity import Activity
 from app.models.organization import Organization
 from app.models.phone import Phone
+from app.models.catalog_version import CatalogVersion
@@ -1,11 +1,18 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.core.db import Base
 
 class Activity(Base):
     __tablename__ = "activities"
+    # поддерево - выборка по префиксу path; на Postgres LIKE 'префикс%' использует индекс только с text_pattern_ops
+    __table_args__ = (Index("ix_activities_path", "path", postgresql_ops={"path": "text_pattern_ops"}),)
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
-    parent_id = Column(Integer, ForeignKey("activities.id", ondelete="SET NULL"), nullable=True)
+    parent_id = Column(Integer, ForeignKey("activities.id", ondelete="SET NULL"), nullable=True, index=True)
+    # глубина узла (корень - 1) и id всех предков вместе с самим узлом: "/1/5/12/"
+    depth = Column(Integer, nullable=False)
+    path = Column(String, nullable=False)
+    # число организаций во всём поддереве (каждая один раз), ведётся при записи
+    org_count = Column(Integer, nullable=False, default=0, server_default="0")
 
     parent = relationship("Activity", remote_side=[id], backref="children")
@@ -8,5 +8,7 @@ class Building(Base):
     address = Column(String, nullable=False)
     latitude = Column(Float, nullable=False)
     longitude = Column(Float, nullable=False)
+    geo_cell = Column(Integer, index=True)
+    org_count = Column(Integer, nullable=False, default=0, server_default="0")
 
     organizations = relationship("Organization", back_populates="building")
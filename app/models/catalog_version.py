@@ -0,0 +1,7 @@
+from sqlalchemy import Column, Integer, String
+from app.core.db import Base
+
+class CatalogVersion(Base):
+    __tablename__ = "catalog_versions"
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, ForeignKey, Index, Table
 from sqlalchemy.orm import relationship
 from app.core.db import Base
 
@@ -7,14 +7,23 @@ org_activity = Table(
     Base.metadata,
     Column("organization_id", Integer, ForeignKey("organizations.id", ondelete="CASCADE"), primary_key=True),
     Column("activity_id", Integer, ForeignKey("activities.id", ondelete="CASCADE"), primary_key=True),
+    Index("ix_org_activity_activity_id", "activity_id", "organization_id"),
 )
 
 class Organization(Base):
     __tablename__ = "organizations"
+    __table_args__ = (
+        Index("ix_organizations_building_id_id", "building_id", "id"),
+        # поиск по подстроке названия (ILIKE) - GIN-индекс pg_trgm, только на Postgres
+        Index(
+            "ix_organizations_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql"),
+    )
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
     building_id = Column(Integer, ForeignKey("buildings.id", ondelete="SET NULL"))
 
     building = relationship("Building", back_populates="organizations")
-    phones = relationship("Phone", cascade="all,delete-orphan")
-    activities = relationship("Activity", secondary=org_activity, backref="organizations")
+    # порядок фиксирован - тот же, что в выгрузке и в org_rows
+    phones = relationship("Phone", cascade="all,delete-orphan", order_by="Phone.id")
+    activities = relationship("Activity", secondary=org_activity, backref="organizations", order_by="Activity.id")
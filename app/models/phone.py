@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from app.core.db import Base
 
 class Phone(Base):
     __tablename__ = "phones"
+    __table_args__ = (Index("ix_phones_organization_id_id", "organization_id", "id", postgresql_include=["number"]),)
     id = Column(Integer, primary_key=True)
     number = Column(String, nullable=False)
     organization_id = Column(Integer, ForeignKey("organizations.id", ondelete="CASCADE"))
@@ -1,5 +1,5 @@
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 class ActivityBase(BaseModel):
     name: str
@@ -8,10 +8,19 @@ class ActivityBase(BaseModel):
 class ActivityCreate(ActivityBase):
     pass
 
+class ActivityMove(BaseModel):
+    parent_id: Optional[int] = None
+
 class Activity(ActivityBase):
     id: int
+    depth: int
+    path: str
     children: List["Activity"] = []
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
-Activity.update_forward_refs()
+Activity.model_rebuild()
+
+class ActivityBrief(ActivityBase):
+    # без рекурсивных children: так активность отдаётся внутри организации
+    id: int
+    model_config = ConfigDict(from_attributes=True)
@@ -1,14 +1,14 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
+from app.schemas.geo import Latitude, Longitude
 
 class BuildingBase(BaseModel):
     address: str
-    latitude: float
-    longitude: float
+    latitude: Latitude
+    longitude: Longitude
 
 class BuildingCreate(BuildingBase):
     pass
 
 class Building(BuildingBase):
     id: int
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,9 @@
+from typing import Annotated
+from pydantic import Field
+from app.core.config import settings
+
+# Координаты и радиус для схем и query-параметров: границы заодно отсекают nan и ±inf,
+# на которых ломается расчёт ячеек geo_cell
+Latitude = Annotated[float, Field(ge=-90, le=90)]
+Longitude = Annotated[float, Field(ge=-180, le=180)]
+RadiusKm = Annotated[float, Field(gt=0, le=settings.MAX_RADIUS_KM)]
@@ -1,7 +1,7 @@
-from typing import List
-from pydantic import BaseModel, Field
+from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field
 from app.schemas.building import Building
-from app.schemas.activity import Activity
+from app.schemas.activity import ActivityBrief
 from app.schemas.phone import Phone
 
 class OrganizationBase(BaseModel):
@@ -16,8 +16,60 @@ class OrganizationCreate(OrganizationBase):
 class Organization(OrganizationBase):
     id: int
     phones: List[Phone]
-    activities: List[Activity]
+    activities: List[ActivityBrief]
     building: Building
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+class OrganizationWithDistance(Organization):
+    distance_km: Optional[float] = None
+
+class OrganizationCompact(BaseModel):
+    # view=compact: только то, что нужно для точки на карте
+    id: int
+    name: str
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+
+class OrganizationCompactWithDistance(OrganizationCompact):
+    distance_km: Optional[float] = None
+
+class OrganizationCluster(BaseModel):
+    # ячейка сетки на карте: сколько в ней организаций, их центр и несколько id для подсказки
+    count: int
+    latitude: float
+    longitude: float
+    sample_ids: List[int]
+
+class OrganizationBatch(BaseModel):
+    # организации в порядке запроса и id, которых нет
+    items: List[Organization]
+    missing: List[int]
+
+class OrganizationCompactBatch(BaseModel):
+    items: List[OrganizationCompact]
+    missing: List[int]
+
+class ActivityFacet(BaseModel):
+    # org_count - организации во всём поддереве активности, каждая один раз
+    id: int
+    name: str
+    parent_id: Optional[int] = None
+    org_count: int
+
+class BuildingFacet(BaseModel):
+    id: int
+    org_count: int
+
+class OrganizationFacets(BaseModel):
+    activities: List[ActivityFacet]
+    buildings: List[BuildingFacet]
+
+class OrganizationBulkError(BaseModel):
+    index: int
+    detail: str
+
+class OrganizationBulkResult(BaseModel):
+    # id созданных организаций в порядке запроса, null - для строк с ошибками
+    ids: List[Optional[int]]
+    errors: List[OrganizationBulkError]
@@ -1,7 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 class Phone(BaseModel):
     id: int
     number: str
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
@@ -1,35 +1,120 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import select, update, case, func, literal
 from app.models.activity import Activity
+from app.models.organization import org_activity
+from app.services.activity_tree import activity_tree
+from app.services.versions import bump_version
+from app.core.config import settings
 
 def get_activity_descendants(db: Session, activity_id: int, max_depth: int = 3):
-    ids = set()
-    frontier = [(activity_id, 1)]
-    while frontier:
-        current_id, depth = frontier.pop()
-        if current_id in ids:
-            continue
-        ids.add(current_id)
-        if depth >= max_depth:
-            continue
-        children = db.execute(select(Activity.id).where(Activity.parent_id == current_id)).scalars().all()
-        for c in children:
-            frontier.append((c, depth + 1))
-    return ids
+    if settings.ACTIVITY_TREE_CACHE:
+        return activity_tree.get(db).descendants(activity_id, max_depth)
+    return query_activity_descendants(db, activity_id, max_depth)
+
+def path_prefix_condition(db: Session, prefix: str):
+    # узлы, чей path начинается с prefix (поддерево). На Postgres LIKE обслуживает индекс с text_pattern_ops;
+    # на SQLite LIKE индекс не использует, а диапазон по бинарному сравнению - использует ('0' идёт сразу за '/')
+    if db.get_bind().dialect.name == "postgresql":
+        return Activity.path.startswith(prefix, autoescape=True)
+    return (Activity.path >= prefix) & (Activity.path < prefix[:-1] + "0")
+
+def path_ids(path: str) -> list[int]:
+    # "/1/5/12/" -> [1, 5, 12]: предки от корня и сам узел
+    return [int(id_) for id_ in path.strip("/").split("/")]
+
+def refresh_activity_org_counts(db: Session, activity_ids: set[int]):
+    # пересчёт с нуля для нескольких узлов: организации всего поддерева, каждая один раз
+    if not activity_ids:
+        return
+    descendant = Activity.__table__.alias("descendant")
+    node = Activity.__table__.alias("node")
+    counts = dict(db.execute(
+        select(node.c.id, func.count(func.distinct(org_activity.c.organization_id)))
+        .select_from(node)
+        .join(descendant, descendant.c.path.startswith(node.c.path))
+        .join(org_activity, org_activity.c.activity_id == descendant.c.id)
+        .where(node.c.id.in_(activity_ids))
+        .group_by(node.c.id)
+    ).all())
+    db.execute(update(Activity), [{"id": id_, "org_count": counts.get(id_, 0)} for id_ in activity_ids])
+
+def query_activity_descendants(db: Session, activity_id: int, max_depth: int = 3):
+    # всё поддерево по префиксу пути, не глубже max_depth уровней от самого узла;
+    # как и раньше, сам узел входит всегда, даже при max_depth < 1
+    node = db.execute(select(Activity.path, Activity.depth).where(Activity.id == activity_id)).first()
+    if node is None:
+        return {activity_id}
+    levels = max(max_depth, 1)
+    stmt = select(Activity.id).where(path_prefix_condition(db, node.path), Activity.depth < node.depth + levels)
+    return set(db.execute(stmt).scalars().all())
+
+def get_activity_ancestors(db: Session, activity_id: int) -> list[Activity] | None:
+    # предки от корня к родителю; их id уже записаны в path, так что это один запрос по первичному ключу
+    path = db.execute(select(Activity.path).where(Activity.id == activity_id)).scalar()
+    if path is None:
+        return None
+    ids = path_ids(path)[:-1]
+    if not ids:
+        return []
+    return db.execute(select(Activity).where(Activity.id.in_(ids)).order_by(Activity.depth)).scalars().all()
 
 def create_activity(db: Session, name: str, parent_id: int | None, max_depth: int):
-    depth = 1
-    current_parent = parent_id
-    while current_parent:
-        parent = db.get(Activity, current_parent)
+    prefix, depth = "/", 1
+    if parent_id is not None:
+        parent = db.get(Activity, parent_id)
         if not parent:
             raise ValueError("parent not found")
-        depth += 1
-        current_parent = parent.parent_id
+        prefix, depth = parent.path, parent.depth + 1
         if depth > max_depth:
             raise ValueError(f"max depth {max_depth} exceeded")
-    a = Activity(name=name, parent_id=parent_id)
+    # id известен только после вставки, путь дописывается следом в той же транзакции
+    a = Activity(name=name, parent_id=parent_id, depth=depth, path=prefix)
     db.add(a)
+    db.flush()
+    a.path = f"{prefix}{a.id}/"
+    bump_version(db, "activities")
     db.commit()
+    activity_tree.invalidate()
     db.refresh(a)
     return a
+
+def move_activity(db: Session, activity_id: int, parent_id: int | None, max_depth: int):
+    """
+    Переносит активность вместе с поддеревом под нового родителя (None - в корень).
+    Пути и глубины всего поддерева переписываются одним UPDATE по префиксу пути.
+    """
+    node = db.get(Activity, activity_id)
+    if node is None:
+        return None
+    prefix, depth = "/", 1
+    if parent_id is not None:
+        parent = db.get(Activity, parent_id)
+        if not parent:
+            raise ValueError("parent not found")
+        if parent.path.startswith(node.path):
+            raise ValueError("cannot move an activity into its own subtree")
+        prefix, depth = parent.path, parent.depth + 1
+    subtree = path_prefix_condition(db, node.path)
+    height = db.execute(select(func.max(Activity.depth)).where(subtree)).scalar() - node.depth
+    if depth + height > max_depth:
+        raise ValueError(f"max depth {max_depth} exceeded")
+
+    old_ancestors = set(path_ids(node.path)[:-1])
+    new_path = f"{prefix}{node.id}/"
+    db.execute(
+        update(Activity)
+        .where(subtree)
+        .values(
+            path=literal(new_path) + func.substr(Activity.path, len(node.path) + 1),
+            depth=Activity.depth + (depth - node.depth),
+            parent_id=case((Activity.id == node.id, parent_id), else_=Activity.parent_id),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    # у самого поддерева счётчики не меняются, у старых и новых предков - пересчитываются
+    refresh_activity_org_counts(db, old_ancestors | set(path_ids(new_path)[:-1]))
+    bump_version(db, "activities")
+    db.commit()
+    activity_tree.invalidate()
+    db.refresh(node)
+    return node
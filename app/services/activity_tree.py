@@ -0,0 +1,57 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+from app.models.activity import Activity
+from app.services.versions import VersionedCache
+from app.core.config import settings
+
+@dataclass(frozen=True)
+class ActivityTree:
+    parent: dict[int, int | None]
+    children: dict[int, tuple[int, ...]]
+    # subtrees[id][d - 1] - поддерево узла глубиной d (сам узел - глубина 1);
+    # хранится до высоты узла, глубже поддерево уже не меняется
+    subtrees: dict[int, tuple[frozenset[int], ...]]
+
+    def descendants(self, activity_id: int, max_depth: int) -> frozenset[int]:
+        levels = self.subtrees.get(activity_id)
+        if levels is None:
+            return frozenset((activity_id,))
+        return levels[min(max(max_depth, 1), len(levels)) - 1]
+
+
+def build_activity_tree(db: Session) -> ActivityTree:
+    rows = db.execute(select(Activity.id, Activity.parent_id)).all()
+    parent = {id_: parent_id for id_, parent_id in rows}
+    children = defaultdict(list)
+    for id_, parent_id in rows:
+        if parent_id in parent:
+            children[parent_id].append(id_)
+
+    # обход в ширину от корней, затем поддеревья собираются снизу вверх
+    order = [id_ for id_, parent_id in rows if parent_id not in parent]
+    for node in order:
+        order.extend(children[node])
+
+    subtrees = {}
+    for node in reversed(order):
+        child_levels = [subtrees[c] for c in children[node]]
+        height = 1 + max((len(levels) for levels in child_levels), default=0)
+        levels = []
+        for d in range(height):
+            subtree = {node}
+            if d:
+                for child in child_levels:
+                    subtree |= child[min(d, len(child)) - 1]
+            levels.append(frozenset(subtree))
+        subtrees[node] = tuple(levels)
+
+    return ActivityTree(
+        parent=parent,
+        children={id_: tuple(ids) for id_, ids in children.items()},
+        subtrees=subtrees,
+    )
+
+
+activity_tree = VersionedCache("activities", build_activity_tree, settings.CACHE_VERSION_CHECK_INTERVAL)
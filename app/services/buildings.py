@@ -1,12 +1,40 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import select, insert
 from app.models.building import Building
+from app.services.geo import geo_cell
+from app.services.nearest import building_index
+from app.services.versions import bump_version
+from app.core.pagination import Page, decode_cursor, paginate
 
 def create_building(db: Session, address: str, latitude: float, longitude: float):
-    b = Building(address=address, latitude=latitude, longitude=longitude)
+    b = Building(address=address, latitude=latitude, longitude=longitude, geo_cell=geo_cell(latitude, longitude))
     db.add(b)
+    version = bump_version(db, "buildings")
     db.commit()
     db.refresh(b)
+    building_index.patch(version, lambda index: index.with_building(b.id, b.latitude, b.longitude))
     return b
 
-def get_buildings(db: Session):
-    return db.query(Building).all()
+def bulk_create_buildings(db: Session, buildings: list[tuple[str, float, float]]) -> list[int]:
+    # (адрес, широта, долгота) -> id в том же порядке; один многострочный INSERT
+    if not buildings:
+        return []
+    ids = db.execute(
+        insert(Building).returning(Building.id, sort_by_parameter_order=True),
+        [
+            {"address": address, "latitude": lat, "longitude": lon, "geo_cell": geo_cell(lat, lon)}
+            for address, lat, lon in buildings
+        ],
+    ).scalars().all()
+    bump_version(db, "buildings")
+    db.commit()
+    building_index.invalidate()
+    return ids
+
+def get_buildings(db: Session, limit: int, after: str | None = None) -> Page:
+    stmt = select(Building)
+    if after is not None:
+        (after_id,) = decode_cursor(after, int)
+        stmt = stmt.where(Building.id > after_id)
+    rows = db.execute(stmt.order_by(Building.id).limit(limit + 1)).scalars().all()
+    return paginate(rows, limit, lambda b: (b.id,))
@@ -0,0 +1,60 @@
+import csv
+import io
+import json
+from collections import defaultdict
+from typing import Iterator
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+from app.models import Organization, Building, Phone
+from app.models.organization import org_activity
+
+EXPORT_COLUMNS = ["id", "name", "building_id", "address", "latitude", "longitude", "phones", "activity_ids"]
+
+def iter_export_batches(db: Session, batch_size: int) -> Iterator[list[dict]]:
+    # организации читаются серверным курсором пачками по batch_size,
+    # телефоны и активности догружаются одним запросом на пачку
+    stmt = select(
+        Organization.id,
+        Organization.name,
+        Organization.building_id,
+        Building.address,
+        Building.latitude,
+        Building.longitude,
+    ).outerjoin(Organization.building).order_by(Organization.id).execution_options(yield_per=batch_size)
+    for chunk in db.execute(stmt).partitions():
+        ids = [row.id for row in chunk]
+        phones = defaultdict(list)
+        for org_id, number in db.execute(
+            select(Phone.organization_id, Phone.number).where(Phone.organization_id.in_(ids)).order_by(Phone.id)
+        ):
+            phones[org_id].append(number)
+        activities = defaultdict(list)
+        for org_id, activity_id in db.execute(
+            select(org_activity.c.organization_id, org_activity.c.activity_id)
+            .where(org_activity.c.organization_id.in_(ids))
+            .order_by(org_activity.c.activity_id)
+        ):
+            activities[org_id].append(activity_id)
+        yield [
+            {**row._asdict(), "phones": phones[row.id], "activity_ids": activities[row.id]}
+            for row in chunk
+        ]
+
+def export_ndjson(db: Session, batch_size: int) -> Iterator[str]:
+    for batch in iter_export_batches(db, batch_size):
+        yield "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in batch)
+
+def export_csv(db: Session, batch_size: int) -> Iterator[str]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(EXPORT_COLUMNS)
+    for batch in iter_export_batches(db, batch_size):
+        for row in batch:
+            writer.writerow([
+                *(row[c] for c in EXPORT_COLUMNS[:6]),
+                ";".join(row["phones"]),
+                ";".join(map(str, row["activity_ids"])),
+            ])
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
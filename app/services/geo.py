@@ -0,0 +1,61 @@
+import math
+from sqlalchemy import func, or_
+from app.models.building import Building
+
+# Пространственный индекс без PostGIS: карта делится на ячейки GEO_CELL_SIZE градусов,
+# номер ячейки хранится в buildings.geo_cell под обычным B-tree индексом.
+# Ячейки нумеруются построчно (по широте), поэтому полоса ячеек одной строки -
+# это непрерывный диапазон номеров, и bbox превращается в несколько BETWEEN по индексу.
+GEO_CELL_SIZE = 0.01
+GEO_CELL_COLUMNS = int(round(360 / GEO_CELL_SIZE)) + 1
+# больше строк - запрос покрывает большую часть таблицы, и индекс уже не помогает
+GEO_CELL_MAX_ROWS = 64
+EARTH_RADIUS_KM = 6371
+
+class InvalidCoordinates(ValueError):
+    pass
+
+def geo_cell_row_col(lat: float, lon: float) -> tuple[int, int]:
+    # роуты проверяют диапазоны сами; сюда nan/inf могут дойти только в обход схем
+    if not (math.isfinite(lat) and math.isfinite(lon)):
+        raise InvalidCoordinates("coordinates must be finite numbers")
+    return math.floor((lat + 90) / GEO_CELL_SIZE), math.floor((lon + 180) / GEO_CELL_SIZE)
+
+def geo_cell(lat: float, lon: float) -> int:
+    row, col = geo_cell_row_col(lat, lon)
+    return row * GEO_CELL_COLUMNS + col
+
+def radius_bbox(lat: float, lon: float, radius_km: float) -> tuple[float, float, float, float]:
+    # bbox, описанный вокруг круга радиуса radius_km: (lat_min, lon_min, lat_max, lon_max)
+    d_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    d_lon = d_lat / math.cos(math.radians(lat))
+    return lat - d_lat, lon - d_lon, lat + d_lat, lon + d_lon
+
+def haversine_term(lat: float, lon: float):
+    # гаверсинус в SQL: sin²(dφ/2) + cos φ1 · cos φ2 · sin²(dλ/2) до здания; растёт вместе с расстоянием,
+    # поэтому годится и для фильтра, и для сортировки - без asin и sqrt
+    lat1 = math.radians(lat)
+    half_dlat = func.sin((func.radians(Building.latitude) - lat1) / 2)
+    half_dlon = func.sin((func.radians(Building.longitude) - math.radians(lon)) / 2)
+    return half_dlat * half_dlat + math.cos(lat1) * func.cos(func.radians(Building.latitude)) * half_dlon * half_dlon
+
+def radius_term(radius_km: float) -> float:
+    # значение haversine_term на расстоянии radius_km
+    return math.sin(radius_km / (2 * EARTH_RADIUS_KM)) ** 2
+
+def term_distance_km(term: float) -> float:
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(max(term, 0.0), 1.0)))
+
+def bbox_conditions(lat_min: float, lon_min: float, lat_max: float, lon_max: float) -> list:
+    conditions = [
+        Building.latitude.between(lat_min, lat_max),
+        Building.longitude.between(lon_min, lon_max),
+    ]
+    row_min, col_min = geo_cell_row_col(lat_min, lon_min)
+    row_max, col_max = geo_cell_row_col(lat_max, lon_max)
+    if 0 < row_max - row_min + 1 <= GEO_CELL_MAX_ROWS and col_min <= col_max:
+        conditions.append(or_(*(
+            Building.geo_cell.between(row * GEO_CELL_COLUMNS + col_min, row * GEO_CELL_COLUMNS + col_max)
+            for row in range(row_min, row_max + 1)
+        )))
+    return conditions
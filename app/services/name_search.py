@@ -0,0 +1,78 @@
+import heapq
+import re
+from dataclasses import dataclass
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+from app.models.organization import Organization
+from app.services.versions import VersionedCache
+from app.core.config import settings
+
+# Запасной поиск по подстроке для баз без pg_trgm (SQLite, тесты): n-граммный
+# инвертированный индекс в памяти процесса. На Postgres используется GIN-индекс pg_trgm.
+_WORD = re.compile(r"\w+")
+
+
+def name_trigrams(name: str) -> set[str]:
+    # триграммы как в pg_trgm: по словам, с двумя пробелами в начале и одним в конце
+    grams = set()
+    for word in _WORD.findall(name.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def trigram_similarity(ga: set[str], gb: set[str]) -> float:
+    if not ga or not gb:
+        return 0.0
+    return len(ga & gb) / len(ga | gb)
+
+
+def similarity(a: str, b: str) -> float:
+    # аналог similarity() из pg_trgm
+    return trigram_similarity(name_trigrams(a), name_trigrams(b))
+
+
+@dataclass(frozen=True)
+class NameIndex:
+    names: dict[int, str]
+    # подстрока из 3 символов -> id организаций, в названии которых она встречается
+    postings: dict[str, frozenset[int]]
+    # триграммы названий для похожести - считаются один раз при построении индекса
+    grams: dict[int, frozenset[str]]
+
+    def matching(self, query: str) -> list[int]:
+        """id организаций, в названии которых есть подстрока query (без учёта регистра), в произвольном порядке."""
+        needle = query.lower()
+        grams = {needle[i:i + 3] for i in range(len(needle) - 2)}
+        if grams:
+            lists = sorted((self.postings.get(g, frozenset()) for g in grams), key=len)
+            candidates = lists[0].intersection(*lists[1:])
+        else:
+            candidates = self.names.keys()
+        return [id_ for id_ in candidates if needle in self.names[id_]]
+
+    def search(self, query: str, limit: int, after: tuple[float, int] | None = None) -> list[tuple[float, int]]:
+        """(похожесть, id) совпавших организаций: самые похожие первыми, строго после ключа after."""
+        query_grams = name_trigrams(query)
+        keys = ((-trigram_similarity(self.grams[id_], query_grams), id_) for id_ in self.matching(query))
+        if after is not None:
+            after_key = (-after[0], after[1])
+            keys = (key for key in keys if key > after_key)
+        # нужны только первые limit: частичный отбор кучей вместо сортировки всех совпадений
+        return [(-score, id_) for score, id_ in heapq.nsmallest(limit, keys)]
+
+
+def build_name_index(db: Session) -> NameIndex:
+    names = {}
+    grams = {}
+    postings: dict[str, set[int]] = {}
+    for id_, name in db.execute(select(Organization.id, Organization.name)):
+        lowered = name.lower()
+        names[id_] = lowered
+        grams[id_] = frozenset(name_trigrams(lowered))
+        for i in range(len(lowered) - 2):
+            postings.setdefault(lowered[i:i + 3], set()).add(id_)
+    return NameIndex(names=names, postings={g: frozenset(ids) for g, ids in postings.items()}, grams=grams)
+
+
+name_index = VersionedCache("organizations", build_name_index, settings.CACHE_VERSION_CHECK_INTERVAL)
@@ -0,0 +1,137 @@
+import heapq
+import math
+from dataclasses import dataclass, replace
+import numpy as np
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+from app.models.building import Building
+from app.services.versions import VersionedCache
+from app.core.config import settings
+
+# Поиск ближайших зданий. Координаты переводятся в точки на единичной сфере:
+# длина хорды монотонна по дуге большого круга, поэтому евклидов k-NN в 3D
+# даёт тот же порядок, что и гаверсинус, и без проблем у полюсов и на 180-м меридиане.
+LEAF_SIZE = 32
+# здания, добавленные после построения дерева, ищутся перебором,
+# пока их не станет больше max(EXTRA_MIN, sqrt(n)) - тогда дерево перестраивается
+EXTRA_MIN = 256
+
+
+def to_unit_xyz(lats, lons) -> np.ndarray:
+    lats, lons = np.radians(np.asarray(lats, dtype=np.float64)), np.radians(np.asarray(lons, dtype=np.float64))
+    cos_lat = np.cos(lats)
+    return np.column_stack((cos_lat * np.cos(lons), cos_lat * np.sin(lons), np.sin(lats)))
+
+
+class KDTree:
+    """Статичное KD-дерево над точками (n, 3) с листьями по LEAF_SIZE точек."""
+
+    def __init__(self, points: np.ndarray):
+        self.order = np.arange(len(points))
+        self._src = points
+        self.lo, self.hi, self.dim, self.split, self.left, self.right = [], [], [], [], [], []
+        if len(points):
+            self._build(0, len(points))
+        self.points = points[self.order]
+        del self._src
+
+    def _build(self, lo: int, hi: int) -> int:
+        node = len(self.lo)
+        self.lo.append(lo)
+        self.hi.append(hi)
+        self.dim.append(0)
+        self.split.append(0.0)
+        self.left.append(-1)
+        self.right.append(-1)
+        if hi - lo <= LEAF_SIZE:
+            return node
+        segment = self.order[lo:hi]
+        pts = self._src[segment]
+        dim = int(np.argmax(pts.max(axis=0) - pts.min(axis=0)))
+        mid = (hi - lo) // 2
+        self.order[lo:hi] = segment[np.argpartition(pts[:, dim], mid)]
+        self.dim[node] = dim
+        self.split[node] = float(self._src[self.order[lo + mid], dim])
+        self.left[node] = self._build(lo, lo + mid)
+        self.right[node] = self._build(lo + mid, hi)
+        return node
+
+    def nearest(self, q: np.ndarray, k: int) -> list[tuple[float, int]]:
+        """k ближайших точек: (квадрат расстояния, номер точки в исходном массиве)."""
+        if not self.lo or k <= 0:
+            return []
+        heap: list[tuple[float, int]] = []  # (-d2, row), в вершине - самый дальний из найденных
+
+        def visit(node: int):
+            if self.left[node] < 0:
+                lo, hi = self.lo[node], self.hi[node]
+                d2 = ((self.points[lo:hi] - q) ** 2).sum(axis=1)
+                for i in np.argsort(d2)[:k].tolist():
+                    item = (-float(d2[i]), lo + i)
+                    if len(heap) < k:
+                        heapq.heappush(heap, item)
+                    elif item > heap[0]:
+                        heapq.heapreplace(heap, item)
+                    else:
+                        break
+                return
+            diff = q[self.dim[node]] - self.split[node]
+            near, far = (self.left[node], self.right[node]) if diff < 0 else (self.right[node], self.left[node])
+            visit(near)
+            if len(heap) < k or diff * diff < -heap[0][0]:
+                visit(far)
+
+        visit(0)
+        return sorted((-d2, int(self.order[row])) for d2, row in heap)
+
+
+@dataclass(frozen=True)
+class BuildingIndex:
+    ids: np.ndarray
+    lats: np.ndarray
+    lons: np.ndarray
+    tree: KDTree
+    extra: tuple[tuple[int, float, float], ...] = ()
+
+    def with_building(self, building_id: int, lat: float, lon: float) -> "BuildingIndex":
+        extra = self.extra + ((building_id, lat, lon),)
+        if len(extra) > max(EXTRA_MIN, math.isqrt(len(self.ids))):
+            ids, lats, lons = zip(*extra)
+            return make_building_index(
+                np.concatenate((self.ids, ids)),
+                np.concatenate((self.lats, lats)),
+                np.concatenate((self.lons, lons)),
+            )
+        return replace(self, extra=extra)
+
+    def nearest(self, lat: float, lon: float, k: int) -> list[tuple[int, float, float]]:
+        """k ближайших зданий (id, широта, долгота), ближайшие первыми."""
+        q = to_unit_xyz([lat], [lon])[0]
+        found = [
+            (d2, int(self.ids[row]), float(self.lats[row]), float(self.lons[row]))
+            for d2, row in self.tree.nearest(q, k)
+        ]
+        if self.extra:
+            ids, lats, lons = zip(*self.extra)
+            d2 = ((to_unit_xyz(lats, lons) - q) ** 2).sum(axis=1)
+            found.extend(zip(d2.tolist(), ids, lats, lons))
+            found.sort()
+        return [(building_id, b_lat, b_lon) for _, building_id, b_lat, b_lon in found[:k]]
+
+    def __len__(self) -> int:
+        return len(self.ids) + len(self.extra)
+
+
+def make_building_index(ids, lats, lons) -> BuildingIndex:
+    ids = np.asarray(ids, dtype=np.int64)
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    return BuildingIndex(ids=ids, lats=lats, lons=lons, tree=KDTree(to_unit_xyz(lats, lons)))
+
+
+def build_building_index(db: Session) -> BuildingIndex:
+    rows = db.execute(select(Building.id, Building.latitude, Building.longitude)).all()
+    return make_building_index(*(zip(*rows) if rows else ((), (), ())))
+
+
+building_index = VersionedCache("buildings", build_building_index, settings.CACHE_VERSION_CHECK_INTERVAL)
@@ -0,0 +1,117 @@
+import json
+from dataclasses import dataclass
+from sqlalchemy import ColumnElement, Select, func, select
+from sqlalchemy.orm import Session
+from app.models import Activity, Organization
+from app.models.organization import org_activity
+from app.services.activities import get_activity_descendants
+from app.services.geo import bbox_conditions, haversine_term, radius_bbox, radius_term
+from app.services.name_search import name_index
+from app.services.org_rows import View, org_dicts, org_select
+from app.core.pagination import Page, decode_cursor, paginate
+
+# Комбинированный запрос организаций: деятельность (с подвидами), радиус и подстрока названия
+# в одном SQL-выражении. Самый избирательный фильтр по дешёвой оценке становится ведущим:
+# его id считаются в MATERIALIZED CTE, а остальные фильтры проверяются уже только на них.
+
+# оценка мощности - count по индексу, но не дальше ESTIMATE_CAP строк (для поддерева активности - её org_count)
+ESTIMATE_CAP = 10_000
+
+
+@dataclass
+class OrgFilter:
+    name: str
+    # id подходящих организаций - для ведущего фильтра
+    ids: Select
+    # условие на строку organizations JOIN buildings - для остальных
+    condition: list[ColumnElement]
+    estimate: int
+
+
+def _estimate(db: Session, ids: Select) -> int:
+    return db.execute(select(func.count()).select_from(ids.limit(ESTIMATE_CAP).subquery())).scalar()
+
+
+def activity_filter(db: Session, activity_id: int, include_descendants: bool, max_depth: int) -> OrgFilter:
+    activity_ids = get_activity_descendants(db, activity_id, max_depth) if include_descendants else {activity_id}
+    # по индексу (activity_id, organization_id), таблицу organizations не трогает
+    ids = select(org_activity.c.organization_id.label("id")).where(org_activity.c.activity_id.in_(activity_ids))
+    if include_descendants:
+        # счётчик поддерева поддерживается при записи - оценка одним чтением по первичному ключу
+        estimate = db.execute(select(Activity.org_count).where(Activity.id == activity_id)).scalar() or 0
+    else:
+        estimate = _estimate(db, ids)
+    return OrgFilter("activity", ids.distinct(), [Organization.id.in_(ids)], estimate)
+
+
+def radius_filter(db: Session, lat: float, lon: float, radius_km: float) -> OrgFilter:
+    condition = [*bbox_conditions(*radius_bbox(lat, lon, radius_km)), haversine_term(lat, lon) <= radius_term(radius_km)]
+    # плотность ячеек bbox: сколько организаций в зданиях внутри bbox (по geo_cell и (building_id, id))
+    in_bbox = select(Organization.id).join(Organization.building).where(*condition[:-1])
+    ids = select(Organization.id).join(Organization.building).where(*condition)
+    return OrgFilter("radius", ids, condition, _estimate(db, in_bbox))
+
+
+def name_filter(db: Session, name: str) -> OrgFilter:
+    if db.get_bind().dialect.name == "postgresql":
+        # ILIKE обслуживает GIN-индекс pg_trgm; % и _ в name экранируются - ищутся как есть, как и в индексе в памяти
+        condition = Organization.name.icontains(name, autoescape=True)
+        ids = select(Organization.id).where(condition)
+        return OrgFilter("name", ids, [condition], _estimate(db, ids))
+    # LIKE в SQLite не понижает регистр кириллицы, поэтому совпадения берутся из n-граммного индекса
+    # в памяти и передаются в запрос одним параметром - JSON-массивом
+    matched = name_index.get(db).matching(name)
+    values = func.json_each(json.dumps(matched)).table_valued("value")
+    ids = select(values.c.value.label("id"))
+    return OrgFilter("name", ids, [Organization.id.in_(ids)], len(matched))
+
+
+def query_orgs(
+    db: Session,
+    activity_id: int | None,
+    include_descendants: bool,
+    max_depth: int,
+    lat: float | None,
+    lon: float | None,
+    radius_km: float | None,
+    name: str | None,
+    limit: int,
+    after: str | None = None,
+    view: View = "full",
+) -> Page:
+    # фильтр задан, если передан его параметр (для радиуса - все три); хотя бы один проверяет роут
+    filters = []
+    if activity_id is not None:
+        filters.append(activity_filter(db, activity_id, include_descendants, max_depth))
+    if radius_km is not None:
+        filters.append(radius_filter(db, lat, lon, radius_km))
+    if name:
+        filters.append(name_filter(db, name))
+    return page_by_filters(db, filters, limit, after, view)
+
+
+def page_by_filters(db: Session, filters: list[OrgFilter], limit: int, after: str | None = None, view: View = "full") -> Page:
+    """
+    Страница организаций (в порядке id), подходящих под все фильтры.
+
+    Ведущий фильтр - с наименьшей оценкой: его id материализуются в CTE, к ним присоединяются
+    организации и здания, остальные фильтры становятся условиями WHERE.
+    """
+    driver, *rest = sorted(filters, key=lambda f: f.estimate)
+    driving_ids = driver.ids
+    if after is not None:
+        (after_id,) = decode_cursor(after, int)
+        driving_ids = driving_ids.where(driving_ids.selected_columns[0] > after_id)
+    # MATERIALIZED (Postgres 12+, SQLite 3.35+) не даёт встроить CTE в основной запрос: ведущий фильтр
+    # вычисляется один раз по своему индексу, а не перепроверяется для каждой строки
+    driving = driving_ids.cte(f"{driver.name}_ids").prefix_with("MATERIALIZED")
+    stmt = (
+        org_select(view=view)
+        .join(driving, driving.c.id == Organization.id)
+        .where(*(c for f in rest for c in f.condition))
+        .order_by(Organization.id)
+        .limit(limit + 1)
+    )
+    rows = db.execute(stmt).all()
+    page = paginate(rows, limit, lambda row: (row.id,))
+    return Page(items=org_dicts(db, page.items, view), next_cursor=page.next_cursor)
@@ -0,0 +1,78 @@
+from collections import defaultdict
+from typing import Literal
+from sqlalchemy import Select, select
+from sqlalchemy.orm import Session
+from app.models import Activity, Building, Organization, Phone
+from app.models.organization import org_activity
+
+# Быстрый путь ответа: организации собираются в dict прямо из столбцов, без ORM-объектов
+# и без валидации pydantic. Порядок ключей совпадает с порядком полей схемы Organization,
+# так что JSON побайтно тот же (проверяется в app.benchmarks.serialization).
+
+ORG_COLUMNS = (
+    Organization.id,
+    Organization.name,
+    Organization.building_id,
+    Building.id.label("b_id"),
+    Building.address,
+    Building.latitude,
+    Building.longitude,
+)
+
+# compact - для карты: только id, название и координаты, без телефонов и активностей
+View = Literal["compact", "full"]
+
+COMPACT_COLUMNS = (
+    Organization.id,
+    Organization.name,
+    Building.latitude,
+    Building.longitude,
+)
+
+def org_select(*extra, view: View = "full") -> Select:
+    """SELECT столбцов организации и её здания; запросы страниц строятся от него."""
+    columns = COMPACT_COLUMNS if view == "compact" else ORG_COLUMNS
+    return select(*columns, *extra).outerjoin(Organization.building)
+
+def org_dicts(db: Session, rows, view: View = "full") -> list[dict]:
+    if view == "compact":
+        return [{"id": row.id, "name": row.name, "latitude": row.latitude, "longitude": row.longitude} for row in rows]
+    # телефоны и активности догружаются двумя запросами на все строки
+    ids = [row.id for row in rows]
+    phones = defaultdict(list)
+    activities = defaultdict(list)
+    if ids:
+        for org_id, phone_id, number in db.execute(
+            select(Phone.organization_id, Phone.id, Phone.number).where(Phone.organization_id.in_(ids)).order_by(Phone.id)
+        ):
+            phones[org_id].append({"id": phone_id, "number": number})
+        for org_id, name, parent_id, activity_id in db.execute(
+            select(org_activity.c.organization_id, Activity.name, Activity.parent_id, Activity.id)
+            .join(Activity, Activity.id == org_activity.c.activity_id)
+            .where(org_activity.c.organization_id.in_(ids))
+            .order_by(Activity.id)
+        ):
+            activities[org_id].append({"name": name, "parent_id": parent_id, "id": activity_id})
+    return [
+        {
+            "name": row.name,
+            "building_id": row.building_id,
+            # поля из OrganizationBase: в ответе всегда пустые
+            "phone_numbers": [],
+            "activity_ids": [],
+            "id": row.id,
+            "phones": phones[row.id],
+            "activities": activities[row.id],
+            "building": None if row.b_id is None else {
+                "address": row.address, "latitude": row.latitude, "longitude": row.longitude, "id": row.b_id,
+            },
+        }
+        for row in rows
+    ]
+
+def org_rows(db: Session, org_ids: list[int], view: View = "full") -> list[dict]:
+    # организации в порядке org_ids; несуществующие id пропускаются
+    if not org_ids:
+        return []
+    by_id = {row.id: row for row in db.execute(org_select(view=view).where(Organization.id.in_(org_ids)))}
+    return org_dicts(db, [by_id[i] for i in org_ids if i in by_id], view)
@@ -1,68 +1,283 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from collections import Counter
+from sqlalchemy import REAL, Integer, and_, bindparam, cast, literal, or_, select, func, insert, update
 from app.models import Organization, Activity, Building, Phone
-from app.services.activities import get_activity_descendants
+from app.models.organization import org_activity
+from app.services.activities import get_activity_descendants, path_ids
+from app.services.geo import EARTH_RADIUS_KM, bbox_conditions, haversine_term, radius_bbox, radius_term, term_distance_km
+from app.services.nearest import building_index
+from app.services.name_search import name_index
+from app.services.org_rows import View, org_dicts, org_rows, org_select
+from app.services.versions import bump_version
+from app.core.pagination import Page, decode_cursor, paginate
 import math
 
+def _add_org_counts(db: Session, model, deltas: dict[int, int]):
+    # org_count += deltas[id] для строк model (Activity или Building), одним executemany
+    table = model.__table__
+    if deltas:
+        db.execute(
+            update(table).where(table.c.id == bindparam("row_id")).values(org_count=table.c.org_count + bindparam("delta")),
+            [{"row_id": id_, "delta": delta} for id_, delta in deltas.items()],
+        )
+
+def _activity_count_deltas(paths_per_org) -> Counter:
+    # организация добавляет 1 каждой активности, в поддереве которой она есть, - один раз,
+    # даже если связана с несколькими её потомками; предки берутся из path
+    deltas = Counter()
+    for paths in paths_per_org:
+        deltas.update({id_ for path in paths for id_ in path_ids(path)})
+    return deltas
+
 def create_organization(db: Session, name: str, building_id: int, phones: list[str], activity_ids: list[int]):
     org = Organization(name=name, building_id=building_id)
     db.add(org)
     db.flush()
     for num in phones:
         db.add(Phone(number=num, organization_id=org.id))
+    acts = []
     if activity_ids:
         acts = db.execute(select(Activity).where(Activity.id.in_(activity_ids))).scalars().all()
         org.activities = acts
+    _add_org_counts(db, Building, {building_id: 1})
+    _add_org_counts(db, Activity, _activity_count_deltas([[a.path for a in acts]]))
+    bump_version(db, "organizations")
     db.commit()
+    name_index.invalidate()
     db.refresh(org)
     return org
 
-def get_org_by_id(db: Session, org_id: int):
-    return db.get(Organization, org_id)
+def bulk_create_organizations(db: Session, orgs: list[dict]) -> tuple[list[int | None], list[tuple[int, str]]]:
+    """
+    Создаёт пачку организаций несколькими многострочными INSERT.
+
+    Каждый элемент orgs - dict с ключами name, building_id, phone_numbers, activity_ids.
+    Здания и активности проверяются одним запросом на всю пачку; строки с ошибками
+    пропускаются. Возвращает id созданных организаций в порядке входа (None для
+    пропущенных) и список ошибок (номер строки, описание).
+    """
+    building_ids = {o["building_id"] for o in orgs}
+    activity_ids = {a for o in orgs for a in o["activity_ids"]}
+    known_buildings = set(db.execute(select(Building.id).where(Building.id.in_(building_ids))).scalars())
+    activity_paths = dict(db.execute(select(Activity.id, Activity.path).where(Activity.id.in_(activity_ids))).all())
+    known_activities = set(activity_paths)
+
+    errors = []
+    valid = []
+    for i, o in enumerate(orgs):
+        missing = sorted(set(o["activity_ids"]) - known_activities)
+        if o["building_id"] not in known_buildings:
+            errors.append((i, f"building {o['building_id']} not found"))
+        elif missing:
+            errors.append((i, f"activities not found: {', '.join(map(str, missing))}"))
+        else:
+            valid.append(i)
+
+    ids: list[int | None] = [None] * len(orgs)
+    if valid:
+        new_ids = db.execute(
+            insert(Organization).returning(Organization.id, sort_by_parameter_order=True),
+            [{"name": orgs[i]["name"], "building_id": orgs[i]["building_id"]} for i in valid],
+        ).scalars().all()
+        for i, org_id in zip(valid, new_ids):
+            ids[i] = org_id
+        phones = [{"organization_id": ids[i], "number": n} for i in valid for n in orgs[i]["phone_numbers"]]
+        if phones:
+            db.execute(insert(Phone), phones)
+        links = [
+            {"organization_id": ids[i], "activity_id": a}
+            for i in valid for a in dict.fromkeys(orgs[i]["activity_ids"])
+        ]
+        if links:
+            db.execute(insert(org_activity), links)
+        _add_org_counts(db, Building, Counter(orgs[i]["building_id"] for i in valid))
+        _add_org_counts(db, Activity, _activity_count_deltas(
+            [activity_paths[a] for a in orgs[i]["activity_ids"]] for i in valid
+        ))
+        bump_version(db, "organizations")
+    db.commit()
+    name_index.invalidate()
+    return ids, errors
+
+def get_org_by_id(db: Session, org_id: int) -> dict | None:
+    rows = org_rows(db, [org_id])
+    return rows[0] if rows else None
+
+def get_orgs_by_ids(db: Session, org_ids: list[int], view: View = "full") -> tuple[list[dict], list[int]]:
+    # организации в порядке org_ids (повторы отдаются один раз) и id, которых нет;
+    # число запросов не зависит от длины списка
+    org_ids = list(dict.fromkeys(org_ids))
+    orgs = org_rows(db, org_ids, view)
+    found = {org["id"] for org in orgs}
+    return orgs, [id_ for id_ in org_ids if id_ not in found]
+
+def get_org_facets(
+    db: Session, building_limit: int, after: str | None = None, building_ids: list[int] | None = None,
+) -> tuple[dict, str | None]:
+    # счётчики поддерживаются при записи, так что это просто чтение двух столбцов;
+    # активностей немного (дерево ограничено глубиной), а здания отдаются страницами по building_limit,
+    # от самых заполненных, с курсором (org_count, id) последнего
+    activities = db.execute(
+        select(Activity.id, Activity.name, Activity.parent_id, Activity.org_count).order_by(Activity.id)
+    ).all()
+    stmt = select(Building.id, Building.org_count)
+    if building_ids is not None:
+        stmt = stmt.where(Building.id.in_(building_ids))
+    if after is not None:
+        after_count, after_id = decode_cursor(after, int, int)
+        stmt = stmt.where(or_(
+            Building.org_count < after_count, and_(Building.org_count == after_count, Building.id > after_id),
+        ))
+    rows = db.execute(stmt.order_by(Building.org_count.desc(), Building.id).limit(building_limit + 1)).all()
+    page = paginate(rows, building_limit, lambda row: (row.org_count, row.id))
+    return {
+        "activities": [{"id": id_, "name": name, "parent_id": parent_id, "org_count": n} for id_, name, parent_id, n in activities],
+        "buildings": [{"id": id_, "org_count": n} for id_, n in page.items],
+    }, page.next_cursor
 
-def get_orgs_by_building(db: Session, building_id: int):
-    return db.execute(select(Organization).where(Organization.building_id == building_id)).scalars().all()
+def _page_by_id(db: Session, stmt, limit: int, after: str | None, view: View) -> Page:
+    # страница организаций в порядке id, следующая начинается после последнего id;
+    # stmt - org_select(view=view) с условиями
+    if after is not None:
+        (after_id,) = decode_cursor(after, int)
+        stmt = stmt.where(Organization.id > after_id)
+    rows = db.execute(stmt.order_by(Organization.id).limit(limit + 1)).all()
+    page = paginate(rows, limit, lambda row: (row.id,))
+    return Page(items=org_dicts(db, page.items, view), next_cursor=page.next_cursor)
 
-def get_orgs_by_activity(db: Session, activity_id: int, include_descendants: bool, max_depth: int):
+def get_orgs_by_building(db: Session, building_id: int, limit: int, after: str | None = None, view: View = "full") -> Page:
+    stmt = org_select(view=view).where(Organization.building_id == building_id)
+    return _page_by_id(db, stmt, limit, after, view)
+
+def get_orgs_by_activity(
+    db: Session, activity_id: int, include_descendants: bool, max_depth: int, limit: int, after: str | None = None,
+    view: View = "full",
+) -> Page:
     if include_descendants:
         ids = get_activity_descendants(db, activity_id, max_depth)
     else:
         ids = {activity_id}
-    stmt = select(Organization).join(Organization.activities).where(Activity.id.in_(ids)).distinct()
-    return db.execute(stmt).scalars().all()
+    matched = select(org_activity.c.organization_id).where(org_activity.c.activity_id.in_(ids))
+    stmt = org_select(view=view).where(Organization.id.in_(matched))
+    return _page_by_id(db, stmt, limit, after, view)
 
-def search_by_name(db: Session, name: str):
-    return db.execute(select(Organization).where(Organization.name.ilike(f"%{name}%"))).scalars().all()
+def search_by_name(db: Session, name: str, limit: int, after: str | None = None, view: View = "full") -> Page:
+    # самые похожие названия первыми, страницы - по ключу (похожесть, id);
+    # на Postgres ILIKE обслуживает GIN-индекс pg_trgm
+    after_key = decode_cursor(after, float, int) if after is not None else None
+    if db.get_bind().dialect.name == "postgresql":
+        score = func.similarity(Organization.name, name)
+        stmt = org_select(score.label("score"), view=view).where(Organization.name.icontains(name, autoescape=True))
+        if after_key is not None:
+            # similarity() - real (float4), а float из курсора драйвер передаёт как double: без приведения
+            # к real граничная строка не равна сама себе и повторяется или пропадает
+            after_id = after_key[1]
+            after_score = cast(literal(after_key[0]), REAL)
+            stmt = stmt.where((score < after_score) | ((score == after_score) & (Organization.id > after_id)))
+        rows = db.execute(stmt.order_by(score.desc(), Organization.id).limit(limit + 1)).all()
+        page = paginate(rows, limit, lambda row: (row.score, row.id))
+        return Page(items=org_dicts(db, page.items, view), next_cursor=page.next_cursor)
+    # снимок индекса может отставать от базы: удалённые организации org_rows пропускает,
+    # поэтому похожесть берётся по id, а не по позиции, и недостающие строки добираются дальше по индексу
+    index = name_index.get(db)
+    scores, orgs, key = {}, [], after_key
+    while True:
+        wanted = limit + 1 - len(orgs)
+        found = index.search(name, wanted, key)
+        scores.update((id_, score) for score, id_ in found)
+        orgs += org_rows(db, [id_ for _, id_ in found], view)
+        if len(found) < wanted or len(orgs) > limit:
+            break
+        key = found[-1]
+    page = paginate(orgs, limit, lambda org: (scores[org["id"]], org["id"]))
+    return Page(items=page.items, next_cursor=page.next_cursor)
 
 # гео-функции (P.S. путем гуглинга решил, что формула гаверсинуса лучше всего подходит)
+
 def haversine(lon1, lat1, lon2, lat2):
-    from math import radians, sin, cos, asin, sqrt
-    lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
+    lon1, lat1, lon2, lat2 = map(math.radians, [lon1, lat1, lon2, lat2])
     dlon, dlat = lon2 - lon1, lat2 - lat1
-    a = sin(dlat/2)**2 + cos(lat1)*cos(lat2)*sin(dlon/2)**2
-    c = 2 * asin(sqrt(a))
-    R = 6371 # радиус земли в км
-    return R * c
-
-def orgs_within_radius(db: Session, lat: float, lon: float, radius_km: float):
-    R = 6371
-    max_lat = lat + (radius_km / R) * (180 / math.pi)
-    min_lat = lat - (radius_km / R) * (180 / math.pi)
-    max_lon = lon + (radius_km / R) * (180 / math.pi) / math.cos(lat * math.pi / 180)
-    min_lon = lon - (radius_km / R) * (180 / math.pi) / math.cos(lat * math.pi / 180)
-    stmt = select(Organization, Building).join(Building).where(
-        Building.latitude.between(min_lat, max_lat),
-        Building.longitude.between(min_lon, max_lon),
-    )
-    results = []
-    for org, b in db.execute(stmt):
-        if haversine(lon, lat, b.longitude, b.latitude) <= radius_km:
-            results.append(org)
-    return results
-
-def orgs_within_bbox(db: Session, lat_min, lon_min, lat_max, lon_max):
-    stmt = select(Organization).join(Building).where(
-        Building.latitude.between(lat_min, lat_max),
-        Building.longitude.between(lon_min, lon_max),
+    a = math.sin(dlat/2)**2 + math.cos(lat1)*math.cos(lat2)*math.sin(dlon/2)**2
+    c = 2 * math.asin(math.sqrt(a))
+    return EARTH_RADIUS_KM * c
+
+def orgs_within_radius(
+    db: Session, lat: float, lon: float, radius_km: float, limit: int, after: str | None = None, view: View = "full"
+) -> Page:
+    # ближайшие первыми: сортировка, ключ страницы и LIMIT - в SQL, так что из базы приходит
+    # limit + 1 строк при любом числе зданий в bbox. Ключ - (haversine_term, id): term растёт
+    # вместе с расстоянием и вычисляется в базе одинаково при каждом запросе
+    term = haversine_term(lat, lon)
+    stmt = org_select(term.label("term"), view=view).where(
+        *bbox_conditions(*radius_bbox(lat, lon, radius_km)), term <= radius_term(radius_km)
     )
-    return db.execute(stmt).scalars().all()
+    if after is not None:
+        after_term, after_id = decode_cursor(after, float, int)
+        stmt = stmt.where((term > after_term) | ((term == after_term) & (Organization.id > after_id)))
+    rows = db.execute(stmt.order_by(term, Organization.id).limit(limit + 1)).all()
+    page = paginate(rows, limit, lambda row: (row.term, row.id))
+    items = list(zip(org_dicts(db, page.items, view), (term_distance_km(row.term) for row in page.items)))
+    return Page(items=items, next_cursor=page.next_cursor)
+
+def nearest_orgs(db: Session, lat: float, lon: float, k: int, view: View = "full") -> list[tuple[dict, float]]:
+    index = building_index.get(db)
+    # в здании может быть сколько угодно организаций (и ни одной), поэтому берём
+    # всё больше ближайших зданий, пока в них не наберётся k организаций
+    limit = k
+    while True:
+        nearest = index.nearest(lat, lon, limit)
+        stmt = select(Organization.id, Organization.building_id).where(
+            Organization.building_id.in_([building_id for building_id, _, _ in nearest])
+        )
+        rows = db.execute(stmt).all()
+        if len(rows) >= k or len(nearest) < limit:
+            break
+        limit *= 4
+    distance = {building_id: haversine(lon, lat, b_lon, b_lat) for building_id, b_lat, b_lon in nearest}
+    ranked = sorted(rows, key=lambda r: (distance[r.building_id], r.id))[:k]
+    org_distance = {r.id: distance[r.building_id] for r in ranked}
+    return [(org, org_distance[org["id"]]) for org in org_rows(db, list(org_distance), view)]
+
+def orgs_within_bbox(
+    db: Session, lat_min, lon_min, lat_max, lon_max, limit: int, after: str | None = None, view: View = "full"
+) -> Page:
+    stmt = org_select(view=view).where(*bbox_conditions(lat_min, lon_min, lat_max, lon_max))
+    return _page_by_id(db, stmt, limit, after, view)
+
+def cluster_cell_size(zoom: int, lat_min, lon_min, lat_max, lon_max, max_cells: int) -> float:
+    # ячейка - четверть тайла веб-карты на этом зуме (~64px); если в bbox их больше max_cells, укрупняем вдвое
+    size = 360 / 2 ** zoom / 4
+    while math.ceil((lat_max - lat_min) / size) * math.ceil((lon_max - lon_min) / size) > max_cells:
+        size *= 2
+    return size
+
+def org_clusters(db: Session, lat_min, lon_min, lat_max, lon_max, cell_size: float, sample_size: int) -> list[dict]:
+    """
+    Кластеры организаций в bbox по сетке cell_size градусов: число организаций в ячейке,
+    центр масс их координат и до sample_size id (наименьших). Считается одним запросом
+    с оконными функциями, так что наружу уходит не больше sample_size строк на ячейку.
+    """
+    # floor, а не голый CAST: CAST на Postgres округляет, на SQLite отбрасывает дробную часть,
+    # и на обоих сливает в одну ячейку точки по разные стороны от нуля
+    cell_row = cast(func.floor((Building.latitude - lat_min) / cell_size), Integer)
+    cell_col = cast(func.floor((Building.longitude - lon_min) / cell_size), Integer)
+    cell = (cell_row, cell_col)
+    ranked = select(
+        Organization.id,
+        cell_row.label("cell_row"),
+        cell_col.label("cell_col"),
+        func.count().over(partition_by=cell).label("count"),
+        func.avg(Building.latitude).over(partition_by=cell).label("latitude"),
+        func.avg(Building.longitude).over(partition_by=cell).label("longitude"),
+        func.row_number().over(partition_by=cell, order_by=Organization.id).label("rn"),
+    ).join(Organization.building).where(*bbox_conditions(lat_min, lon_min, lat_max, lon_max)).subquery()
+    stmt = select(ranked).where(ranked.c.rn <= sample_size).order_by(ranked.c.cell_row, ranked.c.cell_col, ranked.c.rn)
+    clusters = {}
+    for row in db.execute(stmt):
+        cluster = clusters.get((row.cell_row, row.cell_col))
+        if cluster is None:
+            cluster = clusters[row.cell_row, row.cell_col] = {
+                "count": row.count, "latitude": float(row.latitude), "longitude": float(row.longitude), "sample_ids": [],
+            }
+        cluster["sample_ids"].append(row.id)
+    return list(clusters.values())
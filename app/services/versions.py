@@ -0,0 +1,79 @@
+import threading
+import time
+from typing import Callable, Generic, TypeVar
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select, update
+from app.models.catalog_version import CatalogVersion
+
+T = TypeVar("T")
+
+def get_version(db: Session, name: str) -> int:
+    version = db.execute(select(CatalogVersion.version).where(CatalogVersion.name == name)).scalar()
+    return version or 0
+
+def get_catalog_version(db: Session) -> int:
+    # версии только растут, поэтому сумма меняется при любой записи в любой раздел каталога
+    return db.execute(select(func.coalesce(func.sum(CatalogVersion.version), 0))).scalar()
+
+def bump_version(db: Session, name: str) -> int:
+    # вызывается внутри транзакции записи, коммитит вызывающий код;
+    # строка версии остаётся заблокированной до коммита, так что возвращённая версия - наша
+    res = db.execute(update(CatalogVersion).where(CatalogVersion.name == name).values(version=CatalogVersion.version + 1))
+    if not res.rowcount:
+        db.add(CatalogVersion(name=name, version=1))
+        db.flush()
+    return get_version(db, name)
+
+
+class VersionedCache(Generic[T]):
+    """
+    Процессный кеш неизменяемого снимка данных.
+
+    Снимок строится `loader` при первом обращении и перестраивается, когда меняется
+    версия `name` в таблице catalog_versions. Версия сверяется не чаще раза в
+    `check_interval` секунд, так что между проверками чтение идёт только из памяти,
+    а несколько воркеров uvicorn расходятся не дольше чем на этот интервал.
+    """
+
+    def __init__(self, name: str, loader: Callable[[Session], T], check_interval: float):
+        self.name = name
+        self.loader = loader
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._value: T | None = None
+        self._version = -1
+        self._checked_at = 0.0
+
+    def get(self, db: Session) -> T:
+        value = self._value
+        if value is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return value
+        # загрузка идёт без блокировки: в async-режиме сессия переключает greenlet на время
+        # запроса, и другой запрос в том же потоке повис бы на занятом lock;
+        # в худшем случае снимок одновременно построят два запроса
+        version = get_version(db, self.name)
+        if value is None or version != self._version:
+            value = self.loader(db)
+            with self._lock:
+                if version >= self._version:
+                    self._value = value
+                    self._version = version
+        self._checked_at = time.monotonic()
+        return value
+
+    def patch(self, version: int, update: Callable[[T], T]):
+        # применить свою же запись к снимку без полной перестройки; если снимок
+        # отстал больше чем на одну версию, проще построить его заново
+        with self._lock:
+            if self._value is not None and self._version == version - 1:
+                self._value = update(self._value)
+                self._version = version
+            else:
+                self._value = None
+
+    def invalidate(self):
+        # версия сбрасывается вместе со снимком: иначе после пересоздания таблицы catalog_versions
+        # (версии снова с нуля) новый снимок не сохранялся бы, пока версия не догонит старую
+        with self._lock:
+            self._value = None
+            self._version = -1
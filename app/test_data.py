@@ -1,9 +1,15 @@
+import argparse
+import random
+import time
+from sqlalchemy import insert, update
 from sqlalchemy.orm import Session
 from app.core.db import SessionLocal, Base, engine
 from app.models import Building, Activity, Organization
-from app.services.organizations import create_organization
-from app.services.buildings import create_building
+from app.services.organizations import create_organization, bulk_create_organizations
+from app.services.buildings import create_building, bulk_create_buildings
 from app.services.activities import create_activity
+from app.services.activity_tree import activity_tree
+from app.services.versions import bump_version
 from app.core.config import settings
 
 # def init_db():
@@ -68,11 +74,161 @@ def seed_data(db: Session):
         if not exists:
             create_organization(db, o["name"], o["building"], o["phones"], o["activities"])
 
-if __name__ == "__main__":
+# Генератор синтетических данных для нагрузочных тестов.
+# Здания кучкуются вокруг городов пропорционально их размеру, названия организаций
+# собираются из словаря с распределением Ципфа (частые слова встречаются гораздо чаще),
+# дерево активностей строится до MAX_ACTIVITY_DEPTH уровней.
+
+# (город, широта, долгота, вес - примерно население в млн, разброс в градусах)
+CITIES = [
+    ("Москва", 55.7558, 37.6173, 13.0, 0.18),
+    ("Санкт-Петербург", 59.9343, 30.3351, 5.6, 0.12),
+    ("Новосибирск", 55.0084, 82.9357, 1.6, 0.08),
+    ("Екатеринбург", 56.8389, 60.6057, 1.5, 0.07),
+    ("Казань", 55.7963, 49.1088, 1.3, 0.07),
+    ("Нижний Новгород", 56.2965, 43.9361, 1.2, 0.07),
+    ("Краснодар", 45.0355, 38.9753, 1.1, 0.06),
+    ("Самара", 53.1959, 50.1002, 1.1, 0.06),
+    ("Владивосток", 43.1155, 131.8855, 0.6, 0.05),
+    ("Калининград", 54.7104, 20.4522, 0.5, 0.04),
+]
+STREETS = ["Ленина", "Мира", "Советская", "Гагарина", "Садовая", "Лесная", "Центральная", "Новая", "Школьная", "Заводская"]
+ORG_FORMS = ["ООО", "АО", "ИП", "ПАО", "ЗАО"]
+ORG_WORDS = [
+    "Торг", "Сервис", "Строй", "Авто", "Мир", "Профи", "Альфа", "Союз", "Снаб", "Маркет",
+    "Мясо", "Молоко", "Хлеб", "Дом", "Техно", "Гранд", "Север", "Восток", "Регион", "Лидер",
+]
+ACTIVITY_ROOTS = [
+    "Еда", "Автомобили", "Строительство", "Одежда", "Медицина", "Образование",
+    "Электроника", "Мебель", "Спорт", "Туризм", "Финансы", "Связь",
+]
+
+
+def zipf_weights(n: int, s: float = 1.1) -> list[float]:
+    return [1 / (rank ** s) for rank in range(1, n + 1)]
+
+
+def generate_activities(db: Session, fanout: list[int], max_depth: int) -> list[int]:
+    # fanout[0] - число корней, fanout[i] - детей у каждого узла уровня i
+    levels = [[(ACTIVITY_ROOTS[i % len(ACTIVITY_ROOTS)] + (f" {i // len(ACTIVITY_ROOTS) + 1}" if i >= len(ACTIVITY_ROOTS) else ""), None)
+               for i in range(fanout[0])]]
+    all_ids = []
+    parent_rows = None
+    paths = {None: "/"}
+    for depth in range(max_depth):
+        if depth:
+            if depth >= len(fanout):
+                break
+            levels.append([(f"{name} / {j + 1}", parent_id) for name, parent_id in parent_rows for j in range(fanout[depth])])
+        rows = levels[depth]
+        ids = db.execute(
+            insert(Activity).returning(Activity.id, sort_by_parameter_order=True),
+            [{"name": name, "parent_id": parent_id, "depth": depth + 1, "path": paths[parent_id]} for name, parent_id in rows],
+        ).scalars().all()
+        # путь содержит собственный id, поэтому дописывается после вставки уровня
+        for (_, parent_id), id_ in zip(rows, ids):
+            paths[id_] = f"{paths[parent_id]}{id_}/"
+        db.execute(update(Activity), [{"id": id_, "path": paths[id_]} for id_ in ids])
+        all_ids.extend(ids)
+        parent_rows = [(name, id_) for (name, _), id_ in zip(rows, ids)]
+    bump_version(db, "activities")
+    db.commit()
+    activity_tree.invalidate()
+    return all_ids
+
+
+def generate_data(
+    db: Session,
+    buildings: int,
+    orgs: int,
+    activity_fanout: list[int],
+    seed: int = 42,
+    batch_size: int = 5000,
+):
+    rnd = random.Random(seed)
+    started = time.perf_counter()
+
+    activity_ids = generate_activities(db, activity_fanout, settings.MAX_ACTIVITY_DEPTH)
+    # более общие (ранние) активности встречаются чаще узких
+    activity_weights = zipf_weights(len(activity_ids), 0.8)
+    print(f"activities: {len(activity_ids)} ({time.perf_counter() - started:.1f}s)")
+
+    city_weights = [c[3] for c in CITIES]
+    building_ids = []
+    for start in range(0, buildings, batch_size):
+        rows = []
+        for i in range(start, min(start + batch_size, buildings)):
+            city, lat, lon, _, spread = rnd.choices(CITIES, city_weights)[0]
+            rows.append((
+                f"г. {city}, ул. {rnd.choice(STREETS)} {rnd.randint(1, 200)}",
+                rnd.gauss(lat, spread),
+                rnd.gauss(lon, spread * 1.6),
+            ))
+        building_ids.extend(bulk_create_buildings(db, rows))
+    print(f"buildings: {len(building_ids)} ({time.perf_counter() - started:.1f}s)")
+
+    word_weights = zipf_weights(len(ORG_WORDS))
+    created = 0
+    for start in range(0, orgs, batch_size):
+        batch = []
+        for i in range(start, min(start + batch_size, orgs)):
+            words = rnd.choices(ORG_WORDS, word_weights, k=rnd.randint(1, 2))
+            batch.append({
+                "name": f"{rnd.choice(ORG_FORMS)} {''.join(words)} {i + 1}",
+                "building_id": rnd.choice(building_ids),
+                "phone_numbers": [
+                    f"8-{rnd.randint(900, 999)}-{rnd.randint(100, 999)}-{rnd.randint(10, 99)}-{rnd.randint(10, 99)}"
+                    for _ in range(rnd.randint(1, 3))
+                ],
+                "activity_ids": rnd.choices(activity_ids, activity_weights, k=rnd.randint(1, 3)),
+            })
+        ids, _ = bulk_create_organizations(db, batch)
+        created += sum(1 for id_ in ids if id_ is not None)
+    print(f"organizations: {created} ({time.perf_counter() - started:.1f}s)")
+
+
+def parse_count(value: str) -> int:
+    # допускает запись вида 1e6
+    return int(float(value))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Без аргументов - небольшой демо-набор; с --buildings/--orgs - синтетические данные для нагрузочных тестов.",
+    )
+    parser.add_argument("--buildings", type=parse_count)
+    parser.add_argument("--orgs", type=parse_count)
+    parser.add_argument(
+        "--activity-fanout",
+        default="12,6,4",
+        help="число корней и детей на каждом следующем уровне через запятую (не глубже MAX_ACTIVITY_DEPTH)",
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+    buildings, orgs = args.buildings or 0, args.orgs or 0
+    try:
+        fanout = [int(x) for x in args.activity_fanout.split(",")]
+    except ValueError:
+        parser.error(f"--activity-fanout: ожидаются целые числа через запятую, получено {args.activity_fanout!r}")
+    if buildings < 0 or orgs < 0 or min(fanout) < 0:
+        parser.error("--buildings, --orgs и --activity-fanout не могут быть отрицательными")
+    # каждой организации нужно здание и хотя бы одна активность
+    if orgs and not buildings:
+        parser.error("--orgs без --buildings: организациям не к чему привязаться, задайте --buildings > 0")
+    if orgs and not fanout[0]:
+        parser.error("--orgs при нуле корневых активностей в --activity-fanout: организациям нечего присвоить")
+
     # init_db()
     db = SessionLocal()
     try:
-        seed_data(db)
-        print("Test data loaded successfully.")
+        if args.buildings is None and args.orgs is None:
+            seed_data(db)
+            print("Test data loaded successfully.")
+        else:
+            generate_data(db, buildings, orgs, fanout, args.seed, args.batch_size)
     finally:
         db.close()
+
+if __name__ == "__main__":
+    main()
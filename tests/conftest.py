@@ -0,0 +1,67 @@
+import os
+import tempfile
+
+# настройки читаются при импорте app.core.config, поэтому окружение задаётся до импорта приложения
+_db_dir = tempfile.mkdtemp(prefix="catalog-tests-")
+os.environ["API_KEY"] = "test-key"
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/test.db"
+os.environ["DB_ASYNC"] = "false"
+os.environ["READ_REPLICA_URLS"] = ""
+# тесты считают запросы к базе - ответы из кеша их бы спрятали
+os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+# версия снимков в памяти сверяется на каждом запросе: одно и то же число выражений при любом времени
+os.environ["CACHE_VERSION_CHECK_INTERVAL"] = "0"
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.core.db import Base, SessionLocal, engine
+import app.models  # noqa: F401 - таблицы в Base.metadata
+from app.main import app
+from app.services.activity_tree import activity_tree
+from app.services.name_search import name_index
+from app.services.nearest import building_index
+
+API_KEY = {"x-api-key": "test-key"}
+
+
+@pytest.fixture
+def db():
+    # каждый тест - с пустой базой; снимки в памяти сбрасываются, иначе совпавшая версия
+    # выдала бы снимок от предыдущего теста
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    for cache in (activity_tree, name_index, building_index):
+        cache.invalidate()
+    with SessionLocal() as session:
+        yield session
+
+
+@pytest.fixture
+def client():
+    with TestClient(app, headers=API_KEY) as c:
+        yield c
+
+
+class QueryCounter:
+    """Считает SQL-выражения, выполненные движком внутри `with`."""
+
+    def __init__(self):
+        self.count = 0
+
+    def _count(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(engine, "before_cursor_execute", self._count)
+
+
+@pytest.fixture
+def count_queries():
+    return QueryCounter()
@@ -0,0 +1,14 @@
+import pytest
+
+from app.services.activities import query_activity_descendants
+from app.services.activity_tree import activity_tree
+from app.test_data import generate_activities
+
+
+@pytest.mark.parametrize("max_depth", [-1, 0, 1, 2, 3, 4])
+def test_descendants_by_path_match_tree(db, max_depth):
+    ids = generate_activities(db, [2, 3, 2], 3)
+    tree = activity_tree.get(db)
+    for activity_id in ids:
+        expected = tree.descendants(activity_id, max_depth)
+        assert query_activity_descendants(db, activity_id, max_depth) == expected
@@ -0,0 +1,26 @@
+import pytest
+
+from app.services.buildings import bulk_create_buildings
+from app.services.organizations import bulk_create_organizations
+
+
+def test_clusters_split_points_by_cell(client, db):
+    # на зуме 8 ячейка - 360 / 2**8 / 4 = 0.3515625°; граница ячеек - нулевой меридиан,
+    # по обе стороны от него по две организации
+    building_ids = bulk_create_buildings(db, [("a", 51.4, -0.2), ("b", 51.4, -0.1), ("c", 51.4, 0.1), ("d", 51.4, 0.2)])
+    bulk_create_organizations(db, [
+        {"name": f"org {i}", "building_id": b, "phone_numbers": [], "activity_ids": []} for i, b in enumerate(building_ids)
+    ])
+    r = client.get("/api/v1/organizations/clusters?lat_min=51&lon_min=-0.3515625&lat_max=52&lon_max=0.3515625&zoom=8")
+    assert r.status_code == 200
+    assert sorted((c["count"], round(c["longitude"], 2)) for c in r.json()) == [(2, -0.15), (2, 0.15)]
+
+
+@pytest.mark.parametrize("query", [
+    "lat_min=nan&lon_min=0&lat_max=1&lon_max=1&zoom=5",
+    "lat_min=0&lon_min=-inf&lat_max=1&lon_max=1&zoom=5",
+    "lat_min=0&lon_min=0&lat_max=91&lon_max=1&zoom=5",
+    "lat_min=0&lon_min=0&lat_max=1&lon_max=1&zoom=30",
+])
+def test_clusters_reject_out_of_range_params(client, query):
+    assert client.get(f"/api/v1/organizations/clusters?{query}").status_code == 422
@@ -0,0 +1,47 @@
+from app.services.buildings import bulk_create_buildings
+from app.services.organizations import bulk_create_organizations
+
+
+def test_facets_return_busiest_buildings_up_to_limit(client, db):
+    building_ids = bulk_create_buildings(db, [(f"г. Москва, ул. Мира {i}", 55.75, 37.61) for i in range(4)])
+    # в i-м здании i + 1 организаций
+    bulk_create_organizations(db, [
+        {"name": f"org {b} {j}", "building_id": b, "phone_numbers": [], "activity_ids": []}
+        for i, b in enumerate(building_ids) for j in range(i + 1)
+    ])
+
+    r = client.get("/api/v1/organizations/facets?limit=2")
+    assert r.status_code == 200
+    assert r.json()["buildings"] == [
+        {"id": building_ids[3], "org_count": 4},
+        {"id": building_ids[2], "org_count": 3},
+    ]
+    assert client.get("/api/v1/organizations/facets?limit=0").status_code == 422
+
+
+def test_facets_page_through_buildings_and_filter_by_id(client, db):
+    building_ids = bulk_create_buildings(db, [(f"г. Москва, ул. Мира {i}", 55.75, 37.61) for i in range(5)])
+    # по две организации в первых двух зданиях, по одной - в остальных: равные счётчики идут по id
+    bulk_create_organizations(db, [
+        {"name": f"org {b} {j}", "building_id": b, "phone_numbers": [], "activity_ids": []}
+        for i, b in enumerate(building_ids) for j in range(2 if i < 2 else 1)
+    ])
+
+    seen, after = [], None
+    while True:
+        r = client.get("/api/v1/organizations/facets", params={"limit": 2, **({"after": after} if after else {})})
+        assert r.status_code == 200
+        seen += [b["id"] for b in r.json()["buildings"]]
+        after = r.headers.get("X-Next-Cursor")
+        if after is None:
+            break
+    assert seen == building_ids
+
+    r = client.get("/api/v1/organizations/facets", params={"building_ids": f"{building_ids[4]},{building_ids[0]},999"})
+    assert r.json()["buildings"] == [
+        {"id": building_ids[0], "org_count": 2},
+        {"id": building_ids[4], "org_count": 1},
+    ]
+    assert "X-Next-Cursor" not in r.headers
+    assert client.get("/api/v1/organizations/facets?building_ids=1,x").status_code == 400
+    assert client.get("/api/v1/organizations/facets?after=bogus").status_code == 400
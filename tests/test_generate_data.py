@@ -0,0 +1,22 @@
+import sys
+
+import pytest
+
+from app import test_data
+
+
+@pytest.mark.parametrize("argv, message", [
+    (["--orgs", "10", "--buildings", "0"], "--orgs без --buildings"),
+    (["--orgs", "10"], "--orgs без --buildings"),
+    (["--orgs", "10", "--buildings", "5", "--activity-fanout", "0"], "нуле корневых активностей"),
+    (["--buildings", "-1"], "не могут быть отрицательными"),
+    (["--buildings", "5", "--activity-fanout", "12,x"], "--activity-fanout"),
+])
+def test_rejects_inconsistent_counts(monkeypatch, capsys, argv, message):
+    monkeypatch.setattr(sys, "argv", ["test_data", *argv])
+    # ошибка аргументов - до открытия сессии: база не трогается
+    monkeypatch.setattr(test_data, "SessionLocal", lambda: pytest.fail("session opened"))
+    with pytest.raises(SystemExit) as exc:
+        test_data.main()
+    assert exc.value.code == 2
+    assert message in capsys.readouterr().err
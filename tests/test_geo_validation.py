@@ -0,0 +1,33 @@
+import pytest
+
+from app.services.geo import InvalidCoordinates, bbox_conditions
+
+BAD_QUERIES = [
+    "within-bbox?lat_min=nan&lon_min=0&lat_max=1&lon_max=1",
+    "within-bbox?lat_min=0&lon_min=-inf&lat_max=1&lon_max=1",
+    "within-radius?lat=55.75&lon=37.61&radius_km=nan",
+    "within-radius?lat=55.75&lon=37.61&radius_km=inf",
+    "within-radius?lat=55.75&lon=37.61&radius_km=0",
+    "query?lat=nan&lon=37.61&radius_km=1",
+    "query?lat=55.75&lon=37.61&radius_km=inf",
+    "nearest?lat=nan&lon=37.61",
+    "nearest?lat=55.75&lon=181",
+    "clusters?lat_min=nan&lon_min=0&lat_max=1&lon_max=1&zoom=5",
+]
+
+
+@pytest.mark.parametrize("query", BAD_QUERIES)
+def test_non_finite_coordinates_are_rejected(client, db, query):
+    assert client.get(f"/api/v1/organizations/{query}").status_code == 422
+
+
+@pytest.mark.parametrize("latitude", ["NaN", "Infinity", "91"])
+def test_building_coordinates_are_validated(client, db, latitude):
+    body = '{"address": "г. Москва, ул. Ленина 1", "latitude": %s, "longitude": 37.61}' % latitude
+    r = client.post("/api/v1/buildings/", content=body, headers={"content-type": "application/json"})
+    assert r.status_code == 422
+
+
+def test_geo_cell_rejects_non_finite_input():
+    with pytest.raises(InvalidCoordinates):
+        bbox_conditions(float("nan"), 0, 1, 1)
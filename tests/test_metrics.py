@@ -0,0 +1,50 @@
+import re
+
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from app.core.metrics import RequestStats, current_request, instrument_engine
+from app.services.buildings import bulk_create_buildings
+from app.services.organizations import bulk_create_organizations
+
+
+def routes(client) -> set[str]:
+    text = client.get("/metrics").text
+    return set(re.findall(r'^http_requests_total\{method="GET",route="([^"]*)"', text, re.M))
+
+
+def test_metrics_label_routes_by_template(client, db):
+    (building_id,) = bulk_create_buildings(db, [("г. Москва, ул. Ленина 1", 55.75, 37.61)])
+    ids, _ = bulk_create_organizations(db, [
+        {"name": f"ООО Ромашка {i}", "building_id": building_id, "phone_numbers": [], "activity_ids": []} for i in range(2)
+    ])
+
+    assert client.get(f"/api/v1/organizations/{ids[0]}").status_code == 200
+    assert client.get(f"/api/v1/organizations?ids={ids[0]},{ids[1]}").status_code == 200
+    assert client.get(f"/api/v1/organizations/by-building/{building_id}").status_code == 200
+
+    seen = routes(client)
+    assert {
+        "/api/v1/organizations/{org_id}",
+        "/api/v1/organizations",
+        "/api/v1/organizations/by-building/{building_id}",
+    } <= seen
+    assert "" not in seen
+
+
+def test_failed_statements_leave_no_timing_state():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    stats = RequestStats()
+    token = current_request.set(stats)
+    try:
+        with engine.connect() as conn:
+            for _ in range(3):
+                with pytest.raises(exc.OperationalError):
+                    conn.execute(text("SELECT * FROM missing"))
+            conn.execute(text("SELECT 1"))
+            # у упавших выражений after_cursor_execute не вызывается - на соединении ничего не копится
+            assert conn.info == {}
+    finally:
+        current_request.reset(token)
+    assert stats.statements == 1
@@ -0,0 +1,78 @@
+import pytest
+
+from app.core.config import settings
+from app.services.activities import create_activity
+from app.services.buildings import bulk_create_buildings
+from app.services.organizations import bulk_create_organizations
+
+# Число SQL-выражений на запрос к эндпоинту организаций не должно зависеть от числа
+# организаций в ответе: N+1 (ленивые загрузки, запрос на каждую строку) сразу меняет счёт.
+
+N = 5
+LAT, LON = 55.7558, 37.6173
+
+
+def seed(db, building_id: int, activity_id: int, start: int, count: int):
+    bulk_create_organizations(db, [
+        {
+            "name": f"ООО Ромашка {i}",
+            "building_id": building_id,
+            "phone_numbers": [f"8-900-000-{i:04d}", f"8-901-000-{i:04d}"],
+            "activity_ids": [activity_id],
+        }
+        for i in range(start, start + count)
+    ])
+
+
+@pytest.fixture
+def catalog(db):
+    (building_id,) = bulk_create_buildings(db, [("г. Москва, ул. Ленина 1", LAT, LON)])
+    root = create_activity(db, "Еда", None, settings.MAX_ACTIVITY_DEPTH)
+    child = create_activity(db, "Выпечка", root.id, settings.MAX_ACTIVITY_DEPTH)
+    return {"db": db, "building_id": building_id, "activity_id": root.id, "child_id": child.id}
+
+
+ENDPOINTS = {
+    "by_id": lambda c: "/api/v1/organizations/1",
+    "by_building": lambda c: f"/api/v1/organizations/by-building/{c['building_id']}?limit=1000",
+    "by_activity": lambda c: f"/api/v1/organizations/by-activity/{c['activity_id']}?limit=1000",
+    "search": lambda c: "/api/v1/organizations/search?name=ромашка&limit=1000",
+    "within_radius": lambda c: f"/api/v1/organizations/within-radius?lat={LAT}&lon={LON}&radius_km=1&limit=1000",
+    "within_bbox": lambda c: (
+        f"/api/v1/organizations/within-bbox?lat_min={LAT - 0.01}&lon_min={LON - 0.01}"
+        f"&lat_max={LAT + 0.01}&lon_max={LON + 0.01}&limit=1000"
+    ),
+    # k не меньше числа организаций - в ответ попадают все
+    "nearest": lambda c: f"/api/v1/organizations/nearest?lat={LAT}&lon={LON}&k=100",
+    "query": lambda c: (
+        f"/api/v1/organizations/query?activity_id={c['activity_id']}&lat={LAT}&lon={LON}&radius_km=1&name=ромашка&limit=1000"
+    ),
+    # id с запасом на обе партии: сначала почти все в missing
+    "batch": lambda c: "/api/v1/organizations?ids=" + ",".join(str(i) for i in range(1, 10 * N + 1)),
+}
+
+
+def measure(client, count_queries, url: str) -> tuple[int, int]:
+    # первый запрос строит снимки в памяти (дерево активностей, индекс названий), считается второй
+    assert client.get(url).status_code == 200
+    with count_queries:
+        response = client.get(url)
+    assert response.status_code == 200
+    body = response.json()
+    if isinstance(body, dict):
+        # батч: {"items": [...], "missing": [...]}, одна организация - просто объект
+        return count_queries.count, len(body.get("items", [body]))
+    return count_queries.count, len(body)
+
+
+@pytest.mark.parametrize("endpoint", ENDPOINTS)
+def test_query_count_does_not_grow_with_orgs(client, catalog, count_queries, endpoint):
+    url = ENDPOINTS[endpoint](catalog)
+    seed(catalog["db"], catalog["building_id"], catalog["child_id"], 0, N)
+    small, small_items = measure(client, count_queries, url)
+    seed(catalog["db"], catalog["building_id"], catalog["child_id"], N, 9 * N)
+    large, large_items = measure(client, count_queries, url)
+
+    if endpoint != "by_id":
+        assert (small_items, large_items) == (N, 10 * N)
+    assert large == small, f"{endpoint}: {small} queries for {N} orgs, {large} for {10 * N}"
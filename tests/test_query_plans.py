@@ -0,0 +1,9 @@
+from app.benchmarks.query_plans import check_plans
+from app.core.db import engine
+from app.test_data import generate_data
+
+
+def test_hot_queries_use_indexes(db):
+    # небольшой каталог: таблицы от min_rows строк проверяются, справочники помельче - нет
+    generate_data(db, 1000, 3000, [12, 6, 4])
+    assert check_plans(engine, min_rows=500) == []
@@ -0,0 +1,68 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.response_cache import ResponseCacheMiddleware
+from app.main import app
+from app.services.buildings import bulk_create_buildings
+from app.services.organizations import bulk_create_organizations
+
+
+@pytest.fixture
+def cache(db):
+    # в тестах кеш выключен настройкой - здесь middleware оборачивает приложение напрямую
+    return ResponseCacheMiddleware(app)
+
+
+@pytest.fixture
+def cached_client(cache):
+    with TestClient(cache, headers={"x-api-key": "test-key"}) as c:
+        yield c
+
+
+@pytest.fixture
+def org_id(db):
+    (building_id,) = bulk_create_buildings(db, [("г. Москва, ул. Ленина 1", 55.75, 37.61)])
+    ids, _ = bulk_create_organizations(db, [
+        {"name": "ООО Ромашка", "building_id": building_id, "phone_numbers": [], "activity_ids": []}
+    ])
+    return ids[0]
+
+
+def test_not_modified_only_for_ok_responses(cached_client, org_id):
+    ok = cached_client.get(f"/api/v1/organizations/{org_id}")
+    assert ok.status_code == 200 and ok.headers["etag"]
+    etag = ok.headers["etag"]
+
+    # и из кеша, и при промахе (другой ключ) - 304 с пустым телом
+    for url in (f"/api/v1/organizations/{org_id}", f"/api/v1/organizations/{org_id}?view=full"):
+        r = cached_client.get(url, headers={"if-none-match": etag})
+        assert (r.status_code, r.content, r.headers["etag"]) == (304, b"", etag)
+
+    for tag in (etag, "*"):
+        missing = cached_client.get("/api/v1/organizations/999999", headers={"if-none-match": tag})
+        assert missing.status_code == 404
+        assert "etag" not in missing.headers
+
+
+def test_only_write_methods_reset_version():
+    # приложение, отвечающее 200 на любой метод, - как CORS-preflight
+    async def ok(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    cache = ResponseCacheMiddleware(ok)
+    client = TestClient(cache)
+    cache.version._checked_at = 1.0
+    client.options("/api/v1/organizations/1")
+    client.head("/api/v1/organizations/1")
+    client.post("/api/v1/organizations/batch", json={"ids": [1]})
+    assert cache.version._checked_at == 1.0
+
+    client.post("/api/v1/organizations/", json={})
+    assert cache.version._checked_at == 0.0
+
+
+def test_no_cache_header_bypasses_cache(cached_client, org_id):
+    r = cached_client.get(f"/api/v1/organizations/{org_id}", headers={"cache-control": "no-cache"})
+    assert r.status_code == 200
+    assert "etag" not in r.headers